@@ -1,6 +1,4 @@
-include("Acceleration.jl")
 include("CSSE.jl")
-include("Doubling.jl")
 include("Forecast.jl")
 include("Groups.jl")
 include("Population.jl")
@@ -8,9 +6,7 @@ include("RKI.jl")
 include("ImputeRecovered.jl")
 
 using
-.Acceleration,
 .CSSE,
-.Doubling,
 .Forecast,
 .Groups,
 .Population,
@@ -35,20 +31,11 @@ Groups.persist_pop(all_country_data)
 # Imputing recovered
 all_country_data = ImputeRecovered.impute(all_country_data)
 
-# Doubling
-println("Doubling: adding log doubling times")
-all_country_data = all_country_data |> Doubling.initialize_df |> Doubling.gen_df
-
 # write out all country file
 println("Writing transformed_data.csv")
 CSV.write("../plots/data/transformed_data.csv", all_country_data)
 
 
-# Acceleration/overview
-println("Acceleration: writing acceleration.csv")
-Acceleration.gen_acceleration(all_country_data) |> x -> CSV.write("../plots/data/acceleration_data.csv", x)
-
-
 # Forecast
 println("Forecast: writing forecast.csv")
 Forecast.gen_forecast(all_country_data) |> x -> CSV.write("../plots/data/forecasts.csv", x)
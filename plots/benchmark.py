@@ -0,0 +1,254 @@
+"""times main.py's callbacks without a server, on the data scaled to more regions
+
+    python plots/benchmark.py [--regions 380 1000 10000] [--days N] [--steps 10]
+                              [--data plots/data/ | --synthetic]
+                              [--json results.json]
+
+Run from the repository root, like bokeh serve. For every region count the
+csvs in --data are cut or scaled to that many regions, regions past the real
+ones being renamed copies of them, and written to a temporary directory.
+--synthetic writes synthetic.py's made-up data of that size instead.
+main.py is run against them under a plain Document with every tab built, then
+each callback's widget is changed --steps times the way the browser changes
+it. Prints each callback's median and slowest wall time and the bytes of the
+PATCH-DOC message its change would have sent, --json keeps every step.
+"""
+import argparse
+import json
+import os
+import runpy
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from bokeh.document import Document
+from bokeh.document.events import ModelChangedEvent
+from bokeh.io.doc import set_curdoc
+from bokeh.protocol import Protocol
+
+import source.datastore as datastore
+from synthetic import default_days, generate
+
+
+app_dir = os.path.dirname(os.path.abspath(__file__))
+day_ms = 24 * 60 * 60 * 1000
+
+
+def scale_data(data_dir, out_dir, n_regions, days=None):
+    """writes the csvs of data_dir with n_regions regions to out_dir"""
+    data = pd.read_csv(os.path.join(data_dir, "transformed_data.csv"))
+    forecasts = pd.read_csv(os.path.join(data_dir, "forecasts.csv"))
+    if days:
+        # iso dates sort as strings
+        first = np.sort(data.date.unique())[-days]
+        data = data[data.date >= first]
+    real = list(pd.unique(data.country))
+    # the app opens on World
+    if "World" in real:
+        real.remove("World")
+        real.insert(0, "World")
+    names = []
+    copy = 0
+    while len(names) < n_regions:
+        for country in real[: n_regions - len(names)]:
+            name = country if copy == 0 else "{} ({})".format(country, copy)
+            names.append((country, name))
+        copy += 1
+
+    def scaled(df):
+        blocks = df.groupby("country", sort=False).indices
+        empty = np.zeros(0, dtype=int)
+        rows = [blocks.get(country, empty) for country, _ in names]
+        out = df.iloc[np.concatenate(rows)].copy()
+        out["country"] = np.repeat([name for _, name in names], [len(r) for r in rows])
+        return out
+
+    data = scaled(data)
+    scaled(forecasts).to_csv(os.path.join(out_dir, "forecasts.csv"), index=False)
+    data.to_csv(os.path.join(out_dir, "transformed_data.csv"), index=False)
+    shutil.copy(os.path.join(data_dir, "country_groups.csv"), out_dir)
+    return len(data)
+
+
+def build_document():
+    """main.py's globals and its document, every tab built"""
+    doc = Document()
+    set_curdoc(doc)
+    app = runpy.run_path(os.path.join(app_dir, "main.py"))
+    for i in range(len(app["tabs"].tabs)):
+        app["build_tab"](i)
+    return app, doc
+
+
+def rotated(options, current, steps):
+    """steps values cycling through options, starting after current"""
+    start = options.index(current) + 1 if current in options else 0
+    options = options[start:] + options[:start]
+    return [options[i % len(options)] for i in range(steps)]
+
+
+def scenarios(app, steps):
+    """callback name -> widget, property and the values it's set to in turn"""
+    countries = [c for c in app["countries"] if c not in ("None", "---")]
+    picked = [countries[(i + 1) * len(countries) // (steps + 1)] for i in range(steps)]
+    start, end = app["date_range"].value
+    span = 30 * day_ms
+
+    def recent(first_days, last_days):
+        return [max(start, end - first_days * day_ms), end - last_days * day_ms]
+
+    ranges = [
+        [start + span, end],
+        [start + span, end - span],
+        [start, end - span],
+        [start, end],
+        # short enough not to be downsampled, so rows are streamed and cut
+        recent(120, 14),
+        recent(120, 7),
+        recent(113, 0),
+        recent(113, 7),
+        recent(90, 0),
+    ]
+    widgets = [
+        ("country_1_update_plot", "select1", ("value",), picked),
+        # the browser sets value on every tick, value_throttled on release
+        (
+            "date_range_update_plot",
+            "date_range",
+            ("value", "value_throttled"),
+            ranges,
+        ),
+        ("smoothing_update", "smoothing", ("value",), None),
+        ("metric_update", "metric_dropdown", ("value",), None),
+        ("x_axis_update_plot", "x_col", ("value",), None),
+        ("pop_update", "pop_dropdown", ("value",), None),
+    ]
+    out = {}
+    for name, widget_name, attrs, values in widgets:
+        widget = app[widget_name]
+        if values is None:
+            values = widget.options
+        current = getattr(widget, attrs[-1])
+        out[name] = (widget, attrs, rotated(values, current, steps))
+    return out
+
+
+def patch_bytes(events):
+    """size of the PATCH-DOC message the server would send for events"""
+    if not events:
+        return 0
+    message = Protocol().create("PATCH-DOC", events)
+    size = len(message.header_json) + len(message.metadata_json)
+    size += len(message.content_json)
+    for buffer in message.buffers:
+        if isinstance(buffer, tuple):
+            header, payload = buffer
+        else:
+            # bokeh >= 2.3 wraps buffers
+            header, payload = buffer.ref, buffer.to_bytes()
+        size += len(json.dumps(header)) + len(payload)
+    return size
+
+
+def run_callbacks(app, doc, steps):
+    events = []
+
+    # a list's bound append can't be hashed before python 3.8
+    def record(event):
+        events.append(event)
+
+    doc.on_change(record)
+    results = {}
+    for name, (widget, attrs, values) in scenarios(app, steps).items():
+        times, sizes = [], []
+        for value in values:
+            del events[:]
+            start = time.perf_counter()
+            for attr in attrs:
+                widget.set_from_json(attr, value)
+            times.append((time.perf_counter() - start) * 1000)
+            # the browser already has the values it sent
+            sent = [
+                e
+                for e in events
+                if not (
+                    isinstance(e, ModelChangedEvent)
+                    and e.model is widget
+                    and e.attr in attrs
+                )
+            ]
+            sizes.append(patch_bytes(sent))
+        results[name] = {"ms": times, "patch_bytes": sizes}
+    return results
+
+
+def benchmark(data_dir, n_regions, days=None, steps=10, synthetic=False):
+    out_dir = tempfile.mkdtemp(prefix="covid-bench-")
+    try:
+        if synthetic:
+            n_rows = generate(out_dir, n_regions, days or default_days)
+        else:
+            n_rows = scale_data(data_dir, out_dir, n_regions, days)
+        start = time.perf_counter()
+        datastore.load(os.path.join(out_dir, ""))
+        load_s = time.perf_counter() - start
+        start = time.perf_counter()
+        app, doc = build_document()
+        document_s = time.perf_counter() - start
+        callbacks = run_callbacks(app, doc, steps)
+    finally:
+        shutil.rmtree(out_dir)
+    return {
+        "regions": n_regions,
+        "rows": n_rows,
+        "load_s": load_s,
+        "document_s": document_s,
+        "callbacks": callbacks,
+    }
+
+
+def report(result):
+    print(
+        "{:,} regions, {:,} rows: load {:.2f}s, document {:.2f}s".format(
+            result["regions"], result["rows"], result["load_s"], result["document_s"]
+        )
+    )
+    header = ("callback", "median ms", "max ms", "patch bytes")
+    print("  {:<24}{:>11}{:>10}{:>14}".format(*header))
+    for name, steps in result["callbacks"].items():
+        print(
+            "  {:<24}{:>11.1f}{:>10.1f}{:>14,.0f}".format(
+                name,
+                statistics.median(steps["ms"]),
+                max(steps["ms"]),
+                statistics.median(steps["patch_bytes"]),
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--regions", type=int, nargs="+", default=[380, 1000, 10000])
+    parser.add_argument("--days", type=int, help="keep only the last N days")
+    parser.add_argument("--steps", type=int, default=10, help="changes per callback")
+    parser.add_argument("--data", default=os.path.join(app_dir, "data"))
+    parser.add_argument("--synthetic", action="store_true", help="made-up data")
+    parser.add_argument("--json", help="also write every step's numbers here")
+    args = parser.parse_args()
+    results = []
+    for n_regions in args.regions:
+        result = benchmark(
+            args.data, n_regions, args.days, args.steps, args.synthetic
+        )
+        report(result)
+        results.append(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""writes the .npy cache of the csvs, so the server starts without parsing them
+
+    python plots/build_cache.py [data_dir]
+
+Run from the repository root, like bokeh serve. data_dir is plots/data/ by
+default. The cache is gitignored and Heroku's filesystem is reset whenever a
+dyno starts, so bin/post_compile runs this while the slug is built and every
+dyno boots with it. Anywhere else the first server start writes it.
+"""
+import os
+import sys
+
+import source.datastore as datastore
+
+
+if __name__ == "__main__":
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else "plots/data/"
+    datastore.load(os.path.join(data_dir, ""))
@@ -0,0 +1,215 @@
+"""static version of the default view, for hosting without a bokeh server
+
+    python plots/export.py [out_dir]
+
+Run from the repository root, like bokeh serve. Writes to out_dir (export/ by
+default):
+
+    index.html         the page, World against None
+    index.json         the same layout as a json_item, for Bokeh.embed.embed_item
+    countries/<i>.json the data of options[i] of the country dropdowns
+
+Picking a country fetches its bundle and swaps it into the region's sources
+in the browser, and the overview's window dropdown swaps between tables held
+in the page. Everything else needs the live server, the Compare tab is left out.
+"""
+import json
+import os
+import runpy
+import sys
+
+import numpy as np
+from bokeh.document import Document
+from bokeh.embed import file_html, json_item
+from bokeh.io.doc import set_curdoc
+from bokeh.layouts import Spacer, column, row
+from bokeh.models import CustomJS, Div, Select, Tabs
+from bokeh.resources import CDN
+from jinja2 import Environment, FileSystemLoader
+
+
+app_dir = os.path.dirname(os.path.abspath(__file__))
+live_url = "http://covid-19-status-reports.herokuapp.com/"
+
+live_text = """
+<p>Only the country dropdowns work on this page, the <a href="{}">live report</a>
+has every other option.</p>
+""".format(live_url)
+
+# swaps a fetched bundle into one region's sources, bars of region 2 are
+# dodged half a bar to the right like main.dodged does
+switch_code = """
+const i = select.options.indexOf(select.value)
+fetch("countries/" + i + ".json")
+    .then(response => response.json())
+    .then(bundle => {
+        const columns = data => {
+            for (const k in data) {
+                data[k] = data[k].map(v => (v === null ? NaN : v))
+            }
+            return data
+        }
+        const bars = columns(bundle.bar_source)
+        if (dodge && "x_col" in bars) {
+            bars.x_col = bars.x_col.map(x => x + 12 * 60 * 60 * 1000 * bundle.bar_days)
+        }
+        source.data = columns(bundle.source)
+        bar_source.data = bars
+        fc_source.data = columns(bundle.fc_source)
+        const table_data = Object.assign({}, table.data)
+        table_data[table_column] = bundle.table
+        table.data = table_data
+    })
+"""
+
+# shows another window's overview table, its columns renamed to match
+window_code = """
+const names = fields[select.value]
+table.columns.slice(2, 5).forEach((column, i) => {
+    column.field = names[i]
+    column.title = names[i]
+})
+table.source.data = tables[select.value]
+table.change.emit()
+"""
+
+
+def build_app():
+    """runs main.py and returns its globals, with the models free to be laid out again"""
+    doc = Document()
+    set_curdoc(doc)
+    app = runpy.run_path(os.path.join(app_dir, "main.py"))
+    # a static page has nobody to build tabs when they are opened
+    for i in range(len(app["tabs"].tabs)):
+        app["build_tab"](i)
+    doc.clear()
+    return app
+
+
+def plain(columns):
+    """column data as json lists, dates in ms since epoch and nan as null"""
+    out = {}
+    for k, v in columns.items():
+        v = np.asarray(v)
+        if v.dtype.kind == "M":
+            v = v.astype("datetime64[ns]").astype(np.int64) / 1e6
+        if v.dtype.kind == "f":
+            out[k] = [None if np.isnan(x) else x for x in v.tolist()]
+        else:
+            out[k] = v.tolist()
+    return out
+
+
+def region_bundle(app, country):
+    date_value = app["date_range"].value
+    app["update_region"](app["source"], app["bar_source"], country, date_value)
+    forecasts = app["country_forecasts"](
+        country, app["metric_dropdown"].value, date_value
+    )
+    return {
+        "source": plain(app["source"].data),
+        "bar_source": plain(app["bar_source"].data),
+        "fc_source": plain(app["wire"](app["fc_source"], forecasts)),
+        "table": list(app["gen_table"](country, "None")["country1"]),
+        "bar_days": app["bar_days"](date_value),
+    }
+
+
+def country_select(app, title, value, css_class, region):
+    select = Select(
+        title=title, options=app["countries"], value=value, css_classes=[css_class]
+    )
+    suffix = "" if region == 1 else "2"
+    select.js_on_change(
+        "value",
+        CustomJS(
+            args=dict(
+                select=select,
+                source=app["source" + suffix],
+                bar_source=app["bar_source" + suffix],
+                fc_source=app["fc_source" + suffix],
+                table=app["source_table"],
+                table_column="country{}".format(region),
+                dodge=region == 2,
+            ),
+            code=switch_code,
+        ),
+    )
+    return select
+
+
+def window_select(app):
+    current = app["overview_window"]
+    select = Select(title=current.title, options=current.options, value=current.value)
+    fields, tables = {}, {}
+    for days in current.options:
+        app["set_overview_window"](int(days))
+        fields[days] = app["window_names"](int(days))
+        tables[days] = plain(
+            app["wire"](
+                app["source_acceleration_table"], app["store"].overview.table(int(days))
+            )
+        )
+    app["set_overview_window"](int(current.value))
+    select.js_on_change(
+        "value",
+        CustomJS(
+            args=dict(
+                select=select,
+                table=app["acceleration_table"],
+                fields=fields,
+                tables=tables,
+            ),
+            code=window_code,
+        ),
+    )
+    return select
+
+
+def static_layout(app):
+    select1 = country_select(app, "Country/Region 1", "World", "country_1", 1)
+    select2 = country_select(app, "Country/Region 2", "None", "country_2", 2)
+    panels = []
+    for panel in app["tabs"].tabs:
+        children = list(panel.child.children)
+        if app["compare"] in children:
+            # the comparison picks its regions' lines on the server
+            continue
+        if app["overview_window"] in children:
+            children[children.index(app["overview_window"])] = window_select(app)
+            panel.child.children = children
+        panels.append(panel)
+    return column(
+        row(select1, select2),
+        Div(text=live_text, width=600),
+        Spacer(height=15),
+        row(app["data_table"]),
+        Spacer(height=30),
+        # new tabs, without the live app's callback that builds them lazily
+        row(Tabs(tabs=panels)),
+    )
+
+
+def export(out_dir="export/"):
+    app = build_app()
+    layout = static_layout(app)
+    os.makedirs(os.path.join(out_dir, "countries"), exist_ok=True)
+    # the page is written before the bundles reuse its sources
+    template = Environment(loader=FileSystemLoader(os.path.join(app_dir, "templates")))
+    html = file_html(
+        layout,
+        CDN,
+        title="COVID-19 Status Report",
+        template=template.get_template("index.html"),
+    )
+    with open(os.path.join(out_dir, "index.html"), "w") as f:
+        f.write(html)
+    with open(os.path.join(out_dir, "index.json"), "w") as f:
+        json.dump(json_item(layout), f)
+    for i, country in enumerate(app["countries"]):
+        with open(os.path.join(out_dir, "countries", "{}.json".format(i)), "w") as f:
+            json.dump(region_bundle(app, country), f)
+
+
+if __name__ == "__main__":
+    export(*sys.argv[1:])
@@ -0,0 +1,240 @@
+"""opens many sessions at once against a local server and times their changes
+
+    python plots/loadtest.py [--sessions 20] [--num-procs 1] [--actions 20]
+                             [--think 1.0] [--seed 0] [--data DIR]
+                             [--url URL] [--json results.json]
+
+Run from the repository root. Starts serve.py on a free port with --num-procs
+workers, or uses an already running --url, then opens --sessions sessions
+with bokeh.client.pull_session, each in a process of its own. Every session
+makes --actions random changes to the country, date range, smoothing, metric
+and population dropdowns, waiting an exponentially distributed --think
+seconds in between. A change's round trip lasts until the server has run the
+callback and sent back what it changed. Prints the p50/p95/p99 round trip,
+the server's RSS before and at its peak per open session, and the changes
+handled per second. The same seed makes the same changes, so runs with
+different --num-procs can be compared.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from multiprocessing import Pool
+from random import Random
+from urllib.request import urlopen
+
+import numpy as np
+from bokeh.client import pull_session
+
+
+app_dir = os.path.dirname(os.path.abspath(__file__))
+day_ms = 24 * 60 * 60 * 1000
+# the widgets a session changes, by their name in main.py
+widget_names = [
+    "select1",
+    "select2",
+    "date_range",
+    "smoothing",
+    "metric_dropdown",
+    "pop_dropdown",
+]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def start_server(num_procs, data_path=None):
+    """serve.py on a free port, returns the process and the app's url"""
+    port = free_port()
+    env = dict(os.environ)
+    if data_path:
+        env["COVID_DATA_PATH"] = data_path
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(app_dir, "serve.py"),
+            "--port={}".format(port),
+            "--num-procs={}".format(num_procs),
+        ],
+        env=env,
+        # a group of its own, so stop_server reaches the forked workers too
+        start_new_session=True,
+    )
+    url = "http://localhost:{}/{}".format(port, os.path.basename(app_dir))
+    for _ in range(600):
+        try:
+            urlopen(url).close()
+            return server, url
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError("serve.py exited with {}".format(server.returncode))
+            time.sleep(0.1)
+    stop_server(server)
+    raise RuntimeError("serve.py did not answer at " + url)
+
+
+def stop_server(server):
+    os.killpg(server.pid, signal.SIGTERM)
+    server.wait()
+
+
+def rss_bytes(pid):
+    """resident memory of pid and its children, the forked workers"""
+    pids = [pid]
+    for entry in os.listdir("/proc"):
+        try:
+            with open("/proc/{}/stat".format(entry)) as f:
+                # the parent pid is the fourth field, after the parenthesised name
+                if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                    pids.append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+    total = 0
+    for p in pids:
+        try:
+            with open("/proc/{}/status".format(p)) as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            continue
+    return total
+
+
+def random_change(random, widget):
+    """properties, in order, and value the browser would send for a random change of widget"""
+    if widget.name == "date_range":
+        start, end = int(widget.start), int(widget.end)
+        first = random.randint(0, (end - start) // day_ms - 7)
+        last = random.randint(first + 7, (end - start) // day_ms)
+        # value follows every tick, value_throttled the release
+        value = [start + first * day_ms, start + last * day_ms]
+        return ("value", "value_throttled"), value
+    options = [o for o in widget.options if o not in (widget.value, "---")]
+    return ("value",), random.choice(options)
+
+
+def drive(args):
+    """one session's changes, returns their round trips in ms and the errors"""
+    url, index, actions, think, seed = args
+    random = Random(seed * 100003 + index)
+    times, errors = [], []
+    session = pull_session(url=url)
+    try:
+        doc = session.document
+        widgets = [doc.select_one({"name": name}) for name in widget_names]
+        for _ in range(actions):
+            if think:
+                time.sleep(random.expovariate(1 / think))
+            widget = random.choice(widgets)
+            attrs, value = random_change(random, widget)
+            try:
+                start = time.perf_counter()
+                for attr in attrs:
+                    widget.set_from_json(attr, value)
+                # answered once the patch before it has been handled
+                session.force_roundtrip()
+                times.append((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                errors.append(repr(e))
+    finally:
+        session.close()
+    return times, errors
+
+
+def load_test(url, sessions, actions, think, seed, server_pid=None):
+    rss_idle = rss_bytes(server_pid) if server_pid else None
+    rss_peak = rss_idle
+    start = time.perf_counter()
+    with Pool(sessions) as pool:
+        jobs = [(url, i, actions, think, seed) for i in range(sessions)]
+        pending = pool.map_async(drive, jobs)
+        while not pending.ready():
+            pending.wait(0.5)
+            if server_pid:
+                rss_peak = max(rss_peak, rss_bytes(server_pid))
+        results = pending.get()
+    elapsed = time.perf_counter() - start
+    times = np.concatenate([np.asarray(t, dtype=float) for t, _ in results])
+    errors = [e for _, session_errors in results for e in session_errors]
+    p50, p95, p99 = np.percentile(times, [50, 95, 99]) if len(times) else [np.nan] * 3
+    return {
+        "sessions": sessions,
+        "changes": len(times),
+        "errors": len(errors),
+        "first_errors": errors[:5],
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "changes_per_s": len(times) / elapsed,
+        "seconds": elapsed,
+        "rss_idle": rss_idle,
+        "rss_peak": rss_peak,
+        "rss_per_session": (rss_peak - rss_idle) / sessions if server_pid else None,
+    }
+
+
+def report(result):
+    print(
+        "{sessions} sessions, {num_procs} procs: {changes} changes in {seconds:.1f}s, "
+        "{changes_per_s:.1f}/s, {errors} errors".format(**result)
+    )
+    print(
+        "  round trip p50 {p50_ms:.0f} ms, p95 {p95_ms:.0f} ms, "
+        "p99 {p99_ms:.0f} ms".format(**result)
+    )
+    if result["rss_idle"] is not None:
+        print(
+            "  server rss {:.0f} MB idle, {:.0f} MB peak, {:.1f} MB per session".format(
+                result["rss_idle"] / 2 ** 20,
+                result["rss_peak"] / 2 ** 20,
+                result["rss_per_session"] / 2 ** 20,
+            )
+        )
+    for error in result["first_errors"]:
+        print("  " + error)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--num-procs", type=int, default=1)
+    parser.add_argument("--actions", type=int, default=20, help="changes per session")
+    parser.add_argument("--think", type=float, default=1.0, help="mean seconds between")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data", help="directory of csvs to serve, like synthetic.py's")
+    parser.add_argument("--url", help="test this running app instead of starting one")
+    parser.add_argument("--json", help="also write the numbers here")
+    args = parser.parse_args()
+    server = None
+    url = args.url
+    if url is None:
+        server, url = start_server(args.num_procs, args.data)
+    try:
+        result = load_test(
+            url,
+            args.sessions,
+            args.actions,
+            args.think,
+            args.seed,
+            server.pid if server else None,
+        )
+    finally:
+        if server:
+            stop_server(server)
+    result["num_procs"] = args.num_procs if server else None
+    report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
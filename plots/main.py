@@ -4,10 +4,14 @@ from bokeh.io import output_file, show
 from bokeh.layouts import column, row, gridplot, Spacer
 from bokeh.models import (
     Band,
+    CDSView,
+    CustomJS,
+    CustomJSFilter,
     DateRangeSlider,
     DatetimeTickFormatter,
     Div,
     HoverTool,
+    MultiChoice,
     NumeralTickFormatter,
     Select,
     Span,
@@ -21,56 +25,53 @@ from bokeh.models.widgets import (
 )
 from bokeh.transform import dodge
 import numpy as np
-import pandas as pd
 import datetime
 
 import source.aesthetics as aesthetics
+import source.datastore as datastore
+import source.sessions as sessions
+from source.batching import batched, frozen_models
+from source.metrics import count_pushed
+from source.downsample import bucket_bars, bucket_days, thin_lines
+from source.schema import project, wire_schema
+from source.snapshot import snapshot_names
+from source.overview import window_names
 
 
-# data read
-data = pd.read_csv("plots/data/transformed_data.csv", parse_dates=["date"])
-data["date_string"] = data.date.dt.strftime("%Y-%0m-%0d")
-data["x_col"] = data.date
-data["metric"] = data.confirmed
-data["metric_1st_der"] = data.new_cases
-data["metric_2nd_der"] = data.acceleration_cases
-data["smooth_1st_der"] = data.new_cases
-data["smooth_2nd_der"] = data.acceleration_cases
-data["double_3"] = data.double_3_cases
-data["double_5"] = data.double_5_cases
-data["double_10"] = data.double_10_cases
-data["new_active_cases"] = data.new_cases - data.new_deaths - data.new_recoveries
-data["acceleration_active_cases"] = data.new_active_cases.diff(1)
-data["acceleration_recoveries"] = data.new_recoveries.diff(1)
-data = data.sort_values(["country", "date"]).reset_index(drop=True)
-data.days_since_100 = data.days_since_100.replace(0, np.nan)
-data.days_since_10 = data.days_since_10.replace(0, np.nan)
-
-forecasts = pd.read_csv("plots/data/forecasts.csv", parse_dates=["date"])
-forecasts["date_string"] = forecasts.date.dt.strftime("%Y-%0m-%0d")
-forecasts["x_col"] = forecasts.date
-
-acceleration_data = pd.read_csv("plots/data/acceleration_data.csv")
-
-groups = pd.read_csv("plots/data/country_groups.csv")
-groups = list(groups.group.unique())
+# data read, shared with every other session in this process and never changed
+store = datastore.get()
+data_index = store.data_index
+forecast_store = store.forecast_store
+series = store.series
+
+groups = list(store.groups.group.unique())
 groups.sort()
 
-countries = list(data.country.unique())
-countries.sort()
+countries = list(store.countries)
 countries = [x for x in countries if x not in groups]
 countries.remove("World")
 countries = ["World", "None"] + groups + ["---"] + countries
 
-dates = list(data.date.unique())
-dates.sort()
+dates = list(store.dates)
 
 metric_options = ["Cases", "Deaths", "Active Cases", "Recovered Cases"]
-metric_options_count = {"Cases":"confirmed", "Deaths":"deaths", "Active Cases":"active_cases", "Recovered Cases":"recovered"}
-metric_options_1st_der = {"Cases":"new_cases", "Deaths":"new_deaths", "Active Cases":"new_active_cases", "Recovered Cases":"new_recoveries"}
-metric_options_2nd_der = {"Cases":"acceleration_cases", "Deaths":"acceleration_deaths", "Active Cases":"acceleration_active_cases", "Recovered Cases":"acceleration_recoveries"}
 metric_forecast_name = {"Cases":"cases", "Deaths":"deaths", "Active Cases":"active_cases", "Recovered Cases":"recovered"}
 
+# long date ranges are cut down to about what the plots have pixels for: lines
+# keep their shape through LTTB, bars are averaged over several days
+downsampling = True
+plot_width = 600
+line_columns = ["metric", "smooth_1st_der", "smooth_2nd_der"]
+bar_pixels = 4
+
+# with browser_dates the region sources hold their whole series and the
+# browser cuts them to the date range, moving the slider never reaches the
+# server. Series are then sent whole, neither thinned nor bucketed.
+browser_dates = False
+
+# where the doubling lines start, one of source/series.py's doubling anchors
+doubling_anchor = "metric"
+
 # data for data table
 templatebold = """
 <strong style="font-size: 115%">
@@ -84,60 +85,157 @@ templatenormal = """
 """
 
 
-def gen_table(country1, country2):
-    df1 = data.loc[data.country == country1, :].reset_index(drop=True)
-    df2 = data.loc[data.country == country2, :].reset_index(drop=True)
-    overview_df_names = [
-        "Country/Region",
-        "Data as of",
-        "Confirmed Cases",
-        "Recovered Cases",
-        "Active Cases",
-        "Deaths",
-        "Death Rate",
-        "New Cases Yesterday",
-        "Deaths Yesterday",
-    ]
-    if len(df1) > 0:
-        overview_df_values1 = [
-            country1,
-            max(df1.date).strftime("%Y-%m-%d"),
-            "{:,.0f}".format(max(df1.confirmed)),
-            "{:,.0f}".format(max(df1.recovered)),
-            "{:,.0f}".format(df1.active_cases[len(df1)-1]),
-            "{:,.0f}".format(max(df1.deaths)),
-            "{:.2f}".format(df1.death_rate[len(df1) - 1] * 100) + "%",
-            "{:,.0f}".format(df1.new_cases[len(df1) - 1]),
-            "{:,.0f}".format(df1.new_deaths[len(df1) - 1]),
-        ]
-    else:
-        overview_df_values1 = ["", "", "", "", "", "", "", "", ""]
-    if len(df2) > 0:
-        overview_df_values2 = [
-            country2,
-            max(df2.date).strftime("%Y-%m-%d"),
-            "{:,.0f}".format(max(df2.confirmed)),
-            "{:,.0f}".format(max(df2.recovered)),
-            "{:,.0f}".format(df2.active_cases[len(df2)-1]),
-            "{:,.0f}".format(max(df2.deaths)),
-            "{:.2f}".format(df2.death_rate[len(df2) - 1] * 100) + "%",
-            "{:,.0f}".format(df2.new_cases[len(df2) - 1]),
-            "{:,.0f}".format(df2.new_deaths[len(df2) - 1]),
-        ]
-    else:
-        overview_df_values2 = ["", "", "", "", "", "", "", "", ""]
-    overview_df = pd.DataFrame(
-        {
-            "name": overview_df_names,
-            "country1": overview_df_values1,
-            "country2": overview_df_values2,
-        }
+def slider_dates(value):
+    return (
+        datetime.datetime.fromtimestamp(value[0] / 1000),
+        datetime.datetime.fromtimestamp(value[1] / 1000),
+    )
+
+
+def per_capita():
+    return pop_dropdown.value == "Per 100k Population"
+
+
+def data_dates(date_value):
+    """the dates to send rows for, every row when the browser picks the range"""
+    if browser_dates:
+        return None, None
+    return slider_dates(date_value)
+
+
+def country_data(country, date_value):
+    """the plots' columns over the range, shared with other sessions and read-only"""
+    return region_series(country, *data_dates(date_value))
+
+
+def region_series(country, start, end):
+    return series.query(
+        country,
+        metric_dropdown.value,
+        start,
+        end,
+        smoothing.value,
+        per_capita(),
+        x_col.value,
+        doubling_anchor,
+    )
+
+
+def country_forecasts(country, metric, date_value):
+    start, _ = slider_dates(date_value)
+    return forecast_store.get(
+        country, metric_forecast_name[metric], start, per_capita()
+    )
+
+
+def wire(src, columns):
+    """columns projected onto the ones the plots and tables built from src read"""
+    return project(schema[src], columns)
+
+
+def dodged(src, columns, days=1):
+    # on a date axis country 2's bars sit half a bar to the right of country 1's
+    if src is bar_source2 and x_col.value == "Date":
+        columns["x_col"] = columns["x_col"] + np.timedelta64(12 * days, "h")
+    return columns
+
+
+def bar_days(date_value):
+    """days per bar, 1 once the range is short enough to draw every day"""
+    if not downsampling or browser_dates:
+        return 1
+    start, end = slider_dates(date_value)
+    return bucket_days((end - start).days + 1, plot_width // bar_pixels)
+
+
+def line_rows(columns):
+    if not downsampling or browser_dates:
+        return columns
+    return thin_lines(columns, line_columns, plot_width)
+
+
+def bar_rows(columns, days):
+    return bucket_bars(
+        columns,
+        days,
+        mean_columns=["smooth_1st_der", "smooth_2nd_der"],
+        last_columns=["metric"],
+        date_axis=x_col.value == "Date",
+    )
+
+
+def thinned(country, date_value):
+    """whether either of a region's sources is downsampled over the range"""
+    first, last = data_index.rows(country, *slider_dates(date_value))
+    return bar_days(date_value) > 1 or (
+        downsampling and last - first > plot_width
     )
-    table_dict = dict(overview_df)
-    return table_dict
 
 
-acceleration_dict = dict(acceleration_data)
+def update_region(src, bar_src, country, date_value):
+    # sources no built tab reads yet stay empty
+    if src not in schema and bar_src not in schema:
+        return
+    columns = country_data(country, date_value)
+    if src in schema:
+        src.data = wire(src, line_rows(columns))
+    if bar_src in schema:
+        days = bar_days(date_value)
+        bar_src.data = dodged(bar_src, wire(bar_src, bar_rows(columns, days)), days)
+
+
+def update_forecasts(fc_src, country):
+    if fc_src in schema:
+        fc_src.data = wire(
+            fc_src, country_forecasts(country, metric_dropdown.value, date_range.value)
+        )
+
+
+def update_acceleration_table(pop_type):
+    if source_acceleration_table not in schema:
+        return
+    table = store.overview.table(
+        int(overview_window.value), pop_type == "Per 100k Population"
+    )
+    source_acceleration_table.data = wire(source_acceleration_table, table)
+
+
+def free_colors(n, used=()):
+    return [color for color in aesthetics.compare_colors if color not in used][:n]
+
+
+def compare_rows(countries, colors):
+    """a multi_line row of the plots' lines for each region"""
+    rows = {"country": list(countries), "color": list(colors), "xs": []}
+    for col in line_columns:
+        rows[col] = []
+    # the browser can't cut the rows' lines, so they're always cut here
+    start, end = slider_dates(date_range.value)
+    for country in countries:
+        columns = line_rows(region_series(country, start, end))
+        rows["xs"].append(columns["x_col"])
+        for col in line_columns:
+            rows[col].append(columns[col])
+    return wire(compare_source, rows)
+
+
+def update_compare():
+    if compare_source in schema:
+        regions = compare.value
+        compare_source.data = compare_rows(regions, free_colors(len(regions)))
+
+
+def gen_table(country1, country2, pop_type="Total Numbers"):
+    if pop_type == "Per 100k Population":
+        snapshot = store.snapshot_per_100k
+    else:
+        snapshot = store.snapshot
+    empty = [""] * len(snapshot_names)
+    return {
+        "name": snapshot_names,
+        "country1": snapshot.get(country1, empty),
+        "country2": snapshot.get(country2, empty),
+    }
 
 
 # initializing data sources
@@ -162,7 +260,7 @@ data_table = DataTable(
 )
 
 # acceleration overview table source
-source_acceleration_table = ColumnDataSource(acceleration_dict)
+source_acceleration_table = ColumnDataSource()
 columns = [
     TableColumn(
         field="Country/Region",
@@ -229,42 +327,130 @@ acceleration_table = DataTable(
     row_height=25,
 )
 
-# other data sources
-source = ColumnDataSource(data.loc[data.country == "World", :])
-source2 = ColumnDataSource(data.loc[data.country == "None", :])
-fc_source = ColumnDataSource(
-    forecasts.loc[(forecasts.country == "World") & (forecasts.metric == "cases"), :]
-)
-fc_source2 = ColumnDataSource(
-    forecasts.loc[(forecasts.country == "None") & (forecasts.metric == "cases"), :]
-)
+
+def set_overview_window(days):
+    """points the columns that depend on the window at that window's fields"""
+    for table_column, name in zip(
+        acceleration_table.columns[2:5], window_names(days)
+    ):
+        table_column.field = name
+        table_column.title = name
+    if source_acceleration_table in schema:
+        schema[source_acceleration_table] = wire_schema([acceleration_table])[
+            source_acceleration_table
+        ]
+
+# other data sources, filled once a tab that shows them is built
+source = ColumnDataSource()
+source2 = ColumnDataSource()
+# bars are aggregated differently from lines, so they get sources of their own
+bar_source = ColumnDataSource()
+bar_source2 = ColumnDataSource()
+fc_source = ColumnDataSource()
+fc_source2 = ColumnDataSource()
+# each region of the comparison tab is a row of one multi_line source
+compare_source = ColumnDataSource()
+# the sources whose rows follow the date range in the browser: lines get the
+# rows within it sliced out of the whole series, a cut view would leave gaps
+# joined, bars get a filtered view
+line_sources = [source, source2]
+bar_sources = [bar_source, bar_source2]
+
+# the whole series is kept aside whenever a source is first cut or the server
+# sends it new data. The columns are replaced in place, so the cut is never
+# synced back.
+date_slice_code = """
+const [start, end] = slider.value
+for (const source of sources) {
+    if (source === cb_obj || source._whole == null) {
+        source._whole = Object.assign({}, source.data)
+    }
+    const whole = source._whole
+    const dates = whole.date
+    if (dates == null) {
+        continue
+    }
+    let first = 0
+    while (first < dates.length && dates[first] < start) {
+        first++
+    }
+    let last = first
+    while (last < dates.length && dates[last] <= end) {
+        last++
+    }
+    for (const column in whole) {
+        source.data[column] = whole[column].slice(first, last)
+    }
+    source.change.emit()
+}
+"""
+# the rows of the source within the slider's range, inclusive
+date_filter_code = """
+const [start, end] = slider.value
+const dates = source.data.date
+const indices = []
+for (let i = 0; i < dates.length; i++) {
+    if (dates[i] >= start && dates[i] <= end) {
+        indices.push(i)
+    }
+}
+return indices
+"""
+# views of a source filter again whenever it signals a change
+refilter_code = """
+for (const source of sources) {
+    source.change.emit()
+}
+"""
 
 
 # defining plots
+def date_view(src):
+    """a bar glyph's view of src, limited to the date range in the browser"""
+    if not browser_dates:
+        return {}
+    return {"view": CDSView(source=src, filters=[date_filter])}
+
+
 def line_plot(source, p, color, country, metric, dodge_value=None, name=None):
     """data = ColumnDataSource, country = country name, p = bokeh figure"""
     p.line("x_col", metric, source=source, color=color, name=name, width=2)
     return p
 
 
-def change_width(source_data, source_2_data, date):
+def change_width(date, days=1):
+    # a quarter of the spacing between bars, so both regions' bars fit
     if date:
-        n_points = max([len(source_data), len(source_2_data)])
-        width = 24 * 60 * 60 * 10000 / n_points
+        width = days * 24 * 60 * 60 * 1000 / 4
     else:
-        n_points = max([len(source_data), len(source_2_data)])
-        width = 10.0 / n_points
+        width = days * 0.25
     return width
 
 
+def set_bar_widths(days):
+    date = x_col.value == "Date"
+    for p in [
+        "metricbar",
+        "smooth_1st_derbar",
+        "smooth_2nd_derbar",
+    ]:
+        if p not in plots:
+            continue
+        for glyph in plots[p].select({"name": "bar"}):
+            glyph.glyph.width = change_width(date, days)
+            side = 1 if glyph.data_source is bar_source else -1
+            glyph.glyph.x["transform"].value = side * change_width(False, days)
+
+
 def bar_plot(source, p, color, country, metric, dodge_value, name=None):
     p.vbar(
         x=dodge("x_col", value=dodge_value),
-        width=change_width(source.data, source2.data, True),
+        width=change_width(True),
         top=metric,
         source=source,
         color=color,
         name="bar",
+        **date_view(source)
     )
     return p
 
@@ -308,12 +494,18 @@ title_text_font_size='14pt'
 axis_text_font_size='11pt'
 
 def add_plot(plot_function, metric, title, y_axis_type, name=None):
-    p = figure(tools=["save"], title=title, y_axis_type=y_axis_type)
+    p = figure(
+        tools=["save"], title=title, y_axis_type=y_axis_type, plot_width=plot_width
+    )
     p.xaxis.major_label_text_font_size = axis_text_font_size
     p.yaxis.major_label_text_font_size = axis_text_font_size
     p.title.text_font_size = title_text_font_size
-    plot_function(source, p, aesthetics.country_1_color, select1.value, metric, 0.25, name)
-    plot_function(source2, p, aesthetics.country_2_color, select1.value, metric, -0.25, name)
+    if plot_function is bar_plot:
+        src, src2 = bar_source, bar_source2
+    else:
+        src, src2 = source, source2
+    plot_function(src, p, aesthetics.country_1_color, select1.value, metric, 0.25, name)
+    plot_function(src2, p, aesthetics.country_2_color, select1.value, metric, -0.25, name)
     p.xaxis.major_label_orientation = 3.14 / 4
     p.renderers.extend(
         [Span(location=0, dimension="width", line_color="black", line_width=1)]
@@ -405,166 +597,113 @@ def add_forecast_plot(
 
 # selector/dropdown functions
 def country_1_update_plot(attr, old, new):
-    source.data = data.loc[
-        (data.date >= datetime.datetime.fromtimestamp(date_range.value[0] / 1000))
-        & (data.date <= datetime.datetime.fromtimestamp(date_range.value[1] / 1000))
-        & (data.country == new),
-        :,
-    ].reset_index(drop=True)
-    fc_source.data = forecasts.loc[
-        (forecasts.country == new)
-        & (forecasts.metric == metric_forecast_name[metric_dropdown.value])
-        & (
-            forecasts.date
-            >= datetime.datetime.fromtimestamp(date_range.value[0] / 1000)
-        ),
-        :,
-    ].reset_index(drop=True)
-    source_table.data = gen_table(new, select2.value)
+    update_region(source, bar_source, new, date_range.value)
+    update_forecasts(fc_source, new)
+    source_table.data = gen_table(new, select2.value, pop_dropdown.value)
 
 
 def country_2_update_plot(attr, old, new):
-    source2.data = data.loc[
-        (data.date >= datetime.datetime.fromtimestamp(date_range.value[0] / 1000))
-        & (data.date <= datetime.datetime.fromtimestamp(date_range.value[1] / 1000))
-        & (data.country == new),
-        :,
-    ].reset_index(drop=True)
-    if x_col.value == "Date":
-        source2.data["x_col"] = source2.data["x_col"] + pd.Timedelta(hours=12)
-    fc_source2.data = forecasts.loc[
-        (forecasts.country == new)
-        & (forecasts.metric == metric_forecast_name[metric_dropdown.value])
-        & (
-            forecasts.date
-            >= datetime.datetime.fromtimestamp(date_range.value[0] / 1000)
-        ),
-        :,
-    ].reset_index(drop=True)
-    source_table.data = gen_table(select1.value, new)
+    update_region(source2, bar_source2, new, date_range.value)
+    update_forecasts(fc_source2, new)
+    source_table.data = gen_table(select1.value, new, pop_dropdown.value)
+
+
+def update_date_range(src, country, old, new):
+    """sends only the rows that entered the range, rows never change in place"""
+    if src not in schema:
+        return
+    first, last = data_index.rows(country, *slider_dates(new))
+    n_rows = len(src.data["x_col"]) if "x_col" in src.data else 0
+    if old is None:
+        old_first, old_last = 0, -1
+    else:
+        old_first, old_last = data_index.rows(country, *slider_dates(old))
+    if n_rows == 0 and last == first:
+        return
+    elif n_rows != old_last - old_first or last == first:
+        src.data = dodged(src, wire(src, country_data(country, new)))
+    elif doubling_anchor == "slider start" and first != old_first:
+        # the doubling lines of every row start over from the new first day
+        src.data = dodged(src, wire(src, country_data(country, new)))
+    elif first >= old_first and last >= old_last:
+        # new days at the end are appended, days cut from the start roll over
+        columns = wire(src, country_data(country, new))
+        new_rows = {k: v[max(first, old_last) - first :] for k, v in columns.items()}
+        src.stream(dodged(src, new_rows), rollover=last - first)
+    elif first >= old_first:
+        # trimmed at the end, what is already in the source is cut down
+        src.data = {
+            k: v[first - old_first : last - old_first] for k, v in src.data.items()
+        }
+    else:
+        src.data = dodged(src, wire(src, country_data(country, new)))
 
 
 def date_range_update_plot(attr, old, new):
-    source.data = data.loc[
-        (data.date >= datetime.datetime.fromtimestamp(new[0] / 1000))
-        & (data.date <= datetime.datetime.fromtimestamp(new[1] / 1000))
-        & (data.country == select1.value),
-        :,
-    ].reset_index(drop=True)
-    source2.data = data.loc[
-        (data.date >= datetime.datetime.fromtimestamp(new[0] / 1000))
-        & (data.date <= datetime.datetime.fromtimestamp(new[1] / 1000))
-        & (data.country == select2.value),
-        :,
-    ].reset_index(drop=True)
-    for p in [
-        "metricbar",
-        "smooth_1st_derbar",
-        "smooth_2nd_derbar",
+    if browser_dates:
+        # the comparison's lines are rows of their own, which the browser
+        # doesn't cut
+        update_compare()
+        return
+    for src, bar_src, country in [
+        (source, bar_source, select1.value),
+        (source2, bar_source2, select2.value),
     ]:
-        for glyph in plots[p].select({"name": "bar"}):
-            if x_col.value == "Date":
-                glyph.glyph.width = change_width(source.data, source2.data, True)
-            else:
-                glyph.glyph.width = change_width(source.data, source2.data, False)
+        if old is None or thinned(country, old) or thinned(country, new):
+            # downsampled rows are picked for the whole range, resend them
+            update_region(src, bar_src, country, new)
+        else:
+            update_date_range(src, country, old, new)
+            update_date_range(bar_src, country, old, new)
+    set_bar_widths(bar_days(new))
+    update_compare()
+
+
+# one instance of each, shared by every plot, so switching the x axis only
+# repoints the axes instead of adding new models to the document
+date_formatter = DatetimeTickFormatter(
+    days=["%d %b"], months=["%d %b"], years=["%d %b"]
+)
+days_since_formatter = NumeralTickFormatter(format="0,0")
+
+
+def set_x_formatter(p):
     if x_col.value == "Date":
-        source2.data["x_col"] = source2.data["x_col"] + pd.Timedelta(hours=12)
+        p.xaxis.formatter = date_formatter
+    else:
+        p.xaxis.formatter = days_since_formatter
 
 
 def x_axis_update_plot(attr, old, new):
-    ["Date", "Days since 100th case", "Days since 10th death"]
-    x_col = "date"
-    if new == "Date":
-        x_col = "date"
-        for p in all_plots[:-4]:
-            p.xaxis.formatter = DatetimeTickFormatter(
-                days=["%d %b"], months=["%d %b"], years=["%d %b"]
-            )
-    elif new == "Days since 100th case":
-        x_col = "days_since_100"
-        for p in all_plots[:-4]:
-            p.xaxis.formatter = NumeralTickFormatter(format="0,0")
-    elif new == "Days since 10th death":
-        x_col = "days_since_10"
-        for p in all_plots[:-4]:
-            p.xaxis.formatter = NumeralTickFormatter(format="0,0")
-    data.x_col = data[x_col]
-    source.data = data.loc[
-        (data.date >= datetime.datetime.fromtimestamp(date_range.value[0] / 1000))
-        & (data.date <= datetime.datetime.fromtimestamp(date_range.value[1] / 1000))
-        & (data.country == select1.value),
-        :,
-    ].reset_index(drop=True)
-    source2.data = data.loc[
-        (data.date >= datetime.datetime.fromtimestamp(date_range.value[0] / 1000))
-        & (data.date <= datetime.datetime.fromtimestamp(date_range.value[1] / 1000))
-        & (data.country == select2.value),
-        :,
-    ].reset_index(drop=True)
-    for p in [
-        "metricbar",
-        "smooth_1st_derbar",
-        "smooth_2nd_derbar"
-    ]:
-        for glyph in plots[p].select({"name": "bar"}):
-            if new == "Date":
-                glyph.glyph.width = change_width(source.data, source2.data, True)
-            else:
-                glyph.glyph.width = change_width(source.data, source2.data, False)
-    if new == "Date":
-        source2.data["x_col"] = source2.data["x_col"] + pd.Timedelta(hours=12)
-
-
-def smoothing_helper(smoothing_days):
-    if (smoothing_days != "0") & (smoothing_days != 0):
-        data.smooth_1st_der = (
-            data.groupby("country")["metric_1st_der"]
-            .rolling(int(smoothing_days))
-            .mean()
-            .reset_index()
-            .sort_values(["country", "level_1"])["metric_1st_der"]
-            .reset_index(drop=True)
-        )
-        data.smooth_2nd_der = (
-            data.groupby("country")["metric_2nd_der"]
-            .rolling(int(smoothing_days))
-            .mean()
-            .reset_index()
-            .sort_values(["country", "level_1"])["metric_2nd_der"]
-            .reset_index(drop=True)
-        )
-    else:
-        data["smooth_1st_der"] = data.metric_1st_der
-        data["smooth_2nd_der"] = data.metric_2nd_der
-    source.data = data.loc[
-        (data.date >= datetime.datetime.fromtimestamp(date_range.value[0] / 1000))
-        & (data.date <= datetime.datetime.fromtimestamp(date_range.value[1] / 1000))
-        & (data.country == select1.value),
-        :,
-    ].reset_index(drop=True)
-    source2.data = data.loc[
-        (data.date >= datetime.datetime.fromtimestamp(date_range.value[0] / 1000))
-        & (data.date <= datetime.datetime.fromtimestamp(date_range.value[1] / 1000))
-        & (data.country == select2.value),
-        :,
-    ].reset_index(drop=True)
+    # forecasts are always plotted against dates
+    with frozen_models(curdoc()):
+        for name, p in plots.items():
+            if not name.startswith("forecast_"):
+                set_x_formatter(p)
+    update_region(source, bar_source, select1.value, date_range.value)
+    update_region(source2, bar_source2, select2.value, date_range.value)
+    set_bar_widths(bar_days(date_range.value))
+    set_compare_hovers()
+    update_compare()
+
+
+def smoothing_helper():
+    update_region(source, bar_source, select1.value, date_range.value)
+    update_region(source2, bar_source2, select2.value, date_range.value)
+    update_compare()
 
 def smoothing_update(attr, old, new):
-    smoothing_helper(new)
-    if x_col.value == "Date":
-        source2.data["x_col"] = source2.data["x_col"] + pd.Timedelta(hours=12)
+    smoothing_helper()
 
 def rename_plots(metric, pop_type):
     if pop_type == "Per 100k Population":
         suffix = " (per 100k population)"
     else:
         suffix = ""
-    plots["smooth_2nd_derlinear"].title.text = metric + " Acceleration" + suffix
-    plots["metriclog"].title.text = "Cumulative " + metric + suffix
     for p in [
             "metriclinear",
             "smooth_1st_derlinear",
-            "smooth_2nd_derlinear"
+            "smooth_2nd_derlinear",
             "metriclog",
             "smooth_1st_derlog",
             "smooth_2nd_derlog",
@@ -572,13 +711,18 @@ def rename_plots(metric, pop_type):
             "smooth_1st_derbar",
             "smooth_2nd_derbar",
             "forecast_metriclinear",
-            "forecast_metriclog"
+            "forecast_metriclog",
+            "compare_metric",
+            "compare_smooth_1st_der",
+            "compare_smooth_2nd_der",
         ]:
-            if p in ["metriclinear", "metriclog", "metricbar"]:
+            if p not in plots:
+                continue
+            if p in ["metriclinear", "metriclog", "metricbar", "compare_metric"]:
                 plots[p].title.text = "Cumulative " + metric + suffix
-            elif p in ["smooth_1st_derlinear", "smooth_1st_derlog", "smooth_1st_derbar"]:
+            elif p in ["smooth_1st_derlinear", "smooth_1st_derlog", "smooth_1st_derbar", "compare_smooth_1st_der"]:
                 plots[p].title.text = "New Daily " + metric + suffix
-            elif p in ["smooth_2nd_derlinear", "smooth_2nd_derlog", "smooth_2nd_derbar"]:
+            elif p in ["smooth_2nd_derlinear", "smooth_2nd_derlog", "smooth_2nd_derbar", "compare_smooth_2nd_der"]:
                 plots[p].title.text = metric + " Acceleration" + suffix
             elif p == "forecast_metriclinear":
                 plots[p].title.text = "Forecast " + metric + " (linear scale)" + suffix
@@ -586,115 +730,67 @@ def rename_plots(metric, pop_type):
                 plots[p].title.text = "Forecast " + metric + " (log scale)" + suffix
 
 def metric_update(attr, old, new):
-    col_count = metric_options_count[new]
-    col_1st_der = metric_options_1st_der[new]
-    col_2nd_der = metric_options_2nd_der[new]
-    data["metric"] = data[col_count]
-    data["metric_1st_der"] = data[col_1st_der]
-    data["metric_2nd_der"] = data[col_2nd_der]
-    if new == "Cases":
-        data["double_3"] = data.double_3_cases
-        data["double_5"] = data.double_5_cases
-        data["double_10"] = data.double_10_cases
-    elif new == "Deaths":
-        data["double_3"] = data.double_3_deaths
-        data["double_5"] = data.double_5_deaths
-        data["double_10"] = data.double_10_deaths
-    else:
-        data["double_3"] = 0
-        data["double_5"] = 0
-        data["double_10"] = 0
-    fc_source.data = forecasts.loc[
-        (forecasts.country == select1.value)
-        & (forecasts.metric == metric_forecast_name[metric_dropdown.value])
-        & (
-            forecasts.date
-            >= datetime.datetime.fromtimestamp(date_range.value[0] / 1000)
-        ),
-        :,
-    ].reset_index(drop=True)
-    fc_source2.data = forecasts.loc[
-        (forecasts.country == select2.value)
-        & (forecasts.metric == metric_forecast_name[metric_dropdown.value])
-        & (
-            forecasts.date
-            >= datetime.datetime.fromtimestamp(date_range.value[0] / 1000)
-        ),
-        :,
-    ].reset_index(drop=True)
+    update_forecasts(fc_source, select1.value)
+    update_forecasts(fc_source2, select2.value)
     rename_plots(metric_dropdown.value, pop_dropdown.value)
-    smoothing_helper(smoothing.value)
-    if x_col.value == "Date":
-        source2.data["x_col"] = source2.data["x_col"] + pd.Timedelta(hours=12)
+    smoothing_helper()
 
-def make_per_100(df, column, round=False):
-    if round:
-        df[column] = ((df[column] / df["population"]) * 100000).round(2)
-    else:
-        df[column] = ((df[column] / df["population"]) * 100000)
-def make_total(df, column, round=False):
-    if round:
-        df[column] = (df[column] * (df["population"]/100000)).round(2)
-    else:
-        df[column] = (df[column] * (df["population"]/100000))
 def pop_update_helper(new):
-    # graphs
-    for src in [source, source2]:
-        for col in ["confirmed", "deaths", "metric", "metric_1st_der", "metric_2nd_der", "smooth_1st_der", "smooth_2nd_der", "double_3", "double_5", "double_10"]:
-            if new == "Total Numbers":
-                make_total(src.data, col)
-            else:
-                make_per_100(src.data, col)
-    # forecasts
-    for src in [fc_source, fc_source2]:
-        for col in ["point_forecast", "lo_80", "hi_80", "lo_95", "hi_95"]:
-            if new == "Total Numbers":
-                make_total(src.data, col)
-            else:
-                make_per_100(src.data, col)
-    for col in ["point_forecast", "lo_80", "hi_80", "lo_95", "hi_95"]:
-        if new == "Total Numbers":
-            make_total(forecasts, col)
-        else:
-            make_per_100(forecasts, col)
-    # overview table
-    for col in data.columns:
-        if not(col in ["date", "country", "death_rate", "days_since_100", "days_since_10", "population", "date_string", "x_col"]):
-            if new == "Total Numbers":
-                make_total(data, col)
-            else:
-                make_per_100(data, col)
-    source_table.data = gen_table(select1.value, select2.value)
-    # acceleration table
-    acceleration_data = pd.read_csv("plots/data/acceleration_data.csv") 
-    for col in ["Confirmed Cases", "Cases 5 Days Ago", "Recovered Cases", "Active Cases", "Deaths"]:
-        if new != "Total Numbers":
-            make_per_100(acceleration_data, col, True)
-    source_acceleration_table.data = dict(acceleration_data)
+    # everything is re-queried, series.query and the forecast store return
+    # their memoized per-100k rows and gen_table reads the per-100k snapshot
+    update_region(source, bar_source, select1.value, date_range.value)
+    update_region(source2, bar_source2, select2.value, date_range.value)
+    update_forecasts(fc_source, select1.value)
+    update_forecasts(fc_source2, select2.value)
+    source_table.data = gen_table(select1.value, select2.value, new)
+    update_acceleration_table(new)
+    update_compare()
 def pop_update(attr, old, new):
     pop_update_helper(new)
     rename_plots(metric_dropdown.value, pop_dropdown.value)
 
+
+def compare_update(attr, old, new):
+    """drops removed regions' rows and streams a row for each added one"""
+    if compare_source not in schema:
+        return
+    data = compare_source.data
+    kept = [i for i, country in enumerate(data["country"]) if country in new]
+    if len(kept) < len(data["country"]):
+        # what is left is already in the source, nothing is queried again
+        compare_source.data = {k: [v[i] for i in kept] for k, v in data.items()}
+    shown = set(compare_source.data["country"])
+    added = [country for country in new if country not in shown]
+    if added:
+        colors = free_colors(len(added), compare_source.data["color"])
+        compare_source.stream(compare_rows(added, colors))
+
 # dropdowns
 select1 = Select(
     title="Country/Region 1",
     options=countries,
     value="World",
     css_classes=["country_1"],
+    name="select1",
 )
-select1.on_change("value", country_1_update_plot)
+select1.on_change("value", batched(country_1_update_plot))
 
 select2 = Select(
-    title="Country/Region 2", options=countries, value="None", css_classes=["country_2"]
+    title="Country/Region 2",
+    options=countries,
+    value="None",
+    css_classes=["country_2"],
+    name="select2",
 )
-select2.on_change("value", country_2_update_plot)
+select2.on_change("value", batched(country_2_update_plot))
 
 x_col = Select(
     title="X Axis [1]",
     options=["Date", "Days since 100th case", "Days since 10th death"],
     value="Date",
+    name="x_col",
 )
-x_col.on_change("value", x_axis_update_plot)
+x_col.on_change("value", batched(x_axis_update_plot))
 
 date_range = DateRangeSlider(
     title="Date Range",
@@ -704,29 +800,66 @@ date_range = DateRangeSlider(
         dates[0].astype("datetime64[s]").astype("int") * 1000,
         dates[len(dates) - 1].astype("datetime64[s]").astype("int") * 1000,
     ),
+    name="date_range",
 )
-date_range.on_change("value", date_range_update_plot)
+# only update once the handle is released, not on every tick of a drag
+date_range.on_change("value_throttled", batched(date_range_update_plot))
+if browser_dates:
+    date_slice = CustomJS(
+        args=dict(slider=date_range, sources=line_sources), code=date_slice_code
+    )
+    date_range.js_on_change("value", date_slice)
+    for src in line_sources:
+        src.js_on_change("data", date_slice)
+    date_filter = CustomJSFilter(args=dict(slider=date_range), code=date_filter_code)
+    date_range.js_on_change(
+        "value", CustomJS(args=dict(sources=bar_sources), code=refilter_code)
+    )
 
 smoothing = Select(
     title="# Days for moving average smoothing [4]",
     options=["0", "3", "5", "7", "9"],
     value="0",
+    name="smoothing",
 )
-smoothing.on_change("value", smoothing_update)
+smoothing.on_change("value", batched(smoothing_update))
 
 metric_dropdown = Select(
     title="Metric [2]",
     options=metric_options,
-    value="Cases"
+    value="Cases",
+    name="metric_dropdown",
 )
-metric_dropdown.on_change("value", metric_update)
+metric_dropdown.on_change("value", batched(metric_update))
 
 pop_dropdown = Select(
     title="Total/Per 100k Population [3]",
     options=["Total Numbers", "Per 100k Population"],
-    value="Total Numbers"
+    value="Total Numbers",
+    name="pop_dropdown",
 )
-pop_dropdown.on_change("value", pop_update)
+pop_dropdown.on_change("value", batched(pop_update))
+
+
+def overview_window_update(attr, old, new):
+    set_overview_window(int(new))
+    update_acceleration_table(pop_dropdown.value)
+
+
+overview_window = Select(
+    title="Overview Window (Days) [8]", options=["3", "5", "7", "14"], value="5"
+)
+overview_window.on_change("value", batched(overview_window_update))
+
+compare = MultiChoice(
+    title="Countries/Regions to compare [9]",
+    options=[c for c in countries if c not in ("None", "---")],
+    value=["World"],
+    max_items=len(aesthetics.compare_colors),
+    width=600,
+    name="compare",
+)
+compare.on_change("value", batched(compare_update))
 
 
 # plots
@@ -737,188 +870,192 @@ metrics = {
     "smooth_1st_der": "New per Day",
     "smooth_2nd_der": "Acceleration"
 }
-axis_types = ["linear", "log", "bar"]
-for metric, title in metrics.items():
-    for axis_type in axis_types:
-        if axis_type != "bar":
-            # log dotted lines
-            if (metric_dropdown.value in ["Cases", "Deaths"]) & (axis_type == "log"):
-                p = add_plot(line_plot, metric, title, axis_type, "first")
-                p.add_tools(
-                    HoverTool(
-                        tooltips=[
-                            ("Country/Region", "@country"),
-                            ("Date", "@date_string"),
-                            (title, "@" + metric + "{,.00}"),
-                        ],
-                        names=["first"],
-                        mode=hover_mode
-                    ),
-                )
-                # only add doubling lines if it's cases or deaths
-                if metric == "metric":
-                    p.line(
-                        "x_col",
-                        "double_3",
-                        source=source,
-                        color="grey",
-                        line_dash="dashed",
-                        name="double_3",
-                    )
-                    p.line(
-                        "x_col",
-                        "double_5",
-                        source=source,
-                        color="grey",
-                        line_dash="dashed",
-                        name="double_5",
-                    )
-                    p.line(
-                        "x_col",
-                        "double_10",
-                        source=source,
-                        color="grey",
-                        line_dash="dashed",
-                        name="double_10",
-                    )
-                    p.add_tools(
-                        HoverTool(
-                            tooltips=[
-                                ("Country/Region", "@country"),
-                                ("Double every 3 days", "@double_3{,.00}"),
-                            ],
-                            names=["double_3"],
-                            mode="mouse"
-                        ),
-                        HoverTool(
-                            tooltips=[
-                                ("Country/Region", "@country"),
-                                ("Double every 5 days", "@double_5{,.00}"),
-                            ],
-                            names=["double_5"],
-                            mode="mouse"
-                        ),
-                        HoverTool(
-                            tooltips=[
-                                ("Country/Region", "@country"),
-                                ("Double every 10 days", "@double_10{,.00}"),
-                            ],
-                            names=["double_10"],
-                            mode="mouse"
-                        ),
-                    )
-                plots[metric + axis_type] = p
-            else:
-                p = add_plot(line_plot, metric, title, axis_type, "first")
-                p.add_tools(
-                    HoverTool(
-                        tooltips=[
-                            ("Country/Region", "@country"),
-                            ("Date", "@date_string"),
-                            (title, "@" + metric + "{,.00}"),
-                        ],
-                        names=["first"],
-                        mode=hover_mode
-                    )
-                )
-                plots[metric + axis_type] = p
-        else:
-            p = add_plot(bar_plot, metric, title, "linear", "bar")
-            p.add_tools(
-                HoverTool(
-                    tooltips=[
-                        ("Country/Region", "@country"),
-                        ("Date", "@date_string"),
-                        (title, "@" + metric + "{,.00}"),
-                    ],
-                    names=["bar"],
-                    mode=hover_mode
-                )
+
+
+def metric_plot(metric, title, axis_type):
+    if axis_type == "bar":
+        p = add_plot(bar_plot, metric, title, "linear", "bar")
+        p.add_tools(
+            HoverTool(
+                tooltips=[
+                    ("Country/Region", "@country"),
+                    ("Date", "@date_string"),
+                    (title, "@" + metric + "{,.00}"),
+                ],
+                names=["bar"],
+                mode=hover_mode
             )
-            plots[metric + axis_type] = p
-
-# forecast plots
-metrics = {"metric": "Metric Title"}
-for metric, title in metrics.items():
-    for axis_type in axis_types[:-1]:
-        sc = fc_source
-        sc2 = fc_source2
-        if axis_type == "linear":
-            fc_title = title + " (linear scale)"
-        else:
-            fc_title = title + " (log scale)"
-        p = figure(tools=["save"], title=fc_title, y_axis_type=axis_type)
-        p = add_forecast_plot(
-            sc,
-            source,
-            p,
-            metric,
-            actual_color=aesthetics.country_1_color,
-            fc_color=aesthetics.country_1_fc_color,
-            color_80=aesthetics.country_1_80_color,
-            color_95=aesthetics.country_1_95_color,
         )
-        p = add_forecast_plot(
-            sc2,
-            source2,
-            p,
-            metric,
-            actual_color=aesthetics.country_2_color,
-            fc_color=aesthetics.country_2_fc_color,
-            color_80=aesthetics.country_2_80_color,
-            color_95=aesthetics.country_2_95_color,
+        return p
+    p = add_plot(line_plot, metric, title, axis_type, "first")
+    p.add_tools(
+        HoverTool(
+            tooltips=[
+                ("Country/Region", "@country"),
+                ("Date", "@date_string"),
+                (title, "@" + metric + "{,.00}"),
+            ],
+            names=["first"],
+            mode=hover_mode
+        )
+    )
+    # log dotted lines, they are 0 unless the metric is cases or deaths
+    if axis_type == "log" and metric == "metric":
+        p.line(
+            "x_col",
+            "double_3",
+            source=source,
+            color="grey",
+            line_dash="dashed",
+            name="double_3",
+        )
+        p.line(
+            "x_col",
+            "double_5",
+            source=source,
+            color="grey",
+            line_dash="dashed",
+            name="double_5",
+        )
+        p.line(
+            "x_col",
+            "double_10",
+            source=source,
+            color="grey",
+            line_dash="dashed",
+            name="double_10",
         )
-        plots["forecast_" + metric + axis_type] = p
+        p.add_tools(
+            HoverTool(
+                tooltips=[
+                    ("Country/Region", "@country"),
+                    ("Double every 3 days", "@double_3{,.00}"),
+                ],
+                names=["double_3"],
+                mode="mouse"
+            ),
+            HoverTool(
+                tooltips=[
+                    ("Country/Region", "@country"),
+                    ("Double every 5 days", "@double_5{,.00}"),
+                ],
+                names=["double_5"],
+                mode="mouse"
+            ),
+            HoverTool(
+                tooltips=[
+                    ("Country/Region", "@country"),
+                    ("Double every 10 days", "@double_10{,.00}"),
+                ],
+                names=["double_10"],
+                mode="mouse"
+            ),
+        )
+    return p
+
+
+def compare_hover(title):
+    """a comparison plot's tooltips, x shown the way the x axis is
+
+    A multi_line row holds a whole series, so the hover snaps to the point
+    nearest the mouse and shows that point's $data_x and $data_y.
+    """
+    if x_col.value == "Date":
+        x, formatters = ("Date", "$data_x{%d %b %Y}"), {"$data_x": "datetime"}
+    else:
+        x, formatters = (x_col.value, "$data_x{0,0}"), {}
+    tooltips = [("Country/Region", "@country"), x, (title, "$data_y{,.00}")]
+    return dict(tooltips=tooltips, formatters=formatters)
+
+
+def set_compare_hovers():
+    for metric, title in metrics.items():
+        if "compare_" + metric in plots:
+            hover = plots["compare_" + metric].select_one({"type": HoverTool})
+            hover.update(**compare_hover(title))
+
+
+def compare_plot(metric, title):
+    # one glyph and one hover for every region, the legend only on the first plot
+    p = figure(tools=["save"], title=title, plot_width=plot_width)
+    legend = dict(legend_field="country") if metric == "metric" else {}
+    p.multi_line(
+        "xs",
+        metric,
+        source=compare_source,
+        line_color="color",
+        line_width=2,
+        name="compare",
+        **legend
+    )
+    if legend:
+        p.legend.location = "top_left"
+    p.add_tools(
+        HoverTool(
+            names=["compare"],
+            mode=hover_mode,
+            line_policy="nearest",
+            **compare_hover(title)
+        )
+    )
+    p.xaxis.major_label_text_font_size = axis_text_font_size
+    p.yaxis.major_label_text_font_size = axis_text_font_size
+    p.title.text_font_size = title_text_font_size
+    p.xaxis.major_label_orientation = 3.14 / 4
+    p.renderers.extend(
+        [Span(location=0, dimension="width", line_color="black", line_width=1)]
+    )  # adding a horizontal black line at 0
+    p.yaxis.formatter = NumeralTickFormatter(format=",")
+    return p
+
+
+def forecast_figure(metric, title, axis_type):
+    if axis_type == "linear":
+        fc_title = title + " (linear scale)"
+    else:
+        fc_title = title + " (log scale)"
+    p = figure(
+        tools=["save"], title=fc_title, y_axis_type=axis_type, plot_width=plot_width
+    )
+    p = add_forecast_plot(
+        fc_source,
+        source,
+        p,
+        metric,
+        actual_color=aesthetics.country_1_color,
+        fc_color=aesthetics.country_1_fc_color,
+        color_80=aesthetics.country_1_80_color,
+        color_95=aesthetics.country_1_95_color,
+    )
+    p = add_forecast_plot(
+        fc_source2,
+        source2,
+        p,
+        metric,
+        actual_color=aesthetics.country_2_color,
+        fc_color=aesthetics.country_2_fc_color,
+        color_80=aesthetics.country_2_80_color,
+        color_95=aesthetics.country_2_95_color,
+    )
+    return p
+
 
 # log-linear tabs
 line_div_text = """
 <h4>Explanation: README [5]</h4>
 """
-
-# initialize plot names
-rename_plots("Cases", pop_dropdown.value)
-
-linear_tab_layout = column(
-    row(Div(text=line_div_text, width=600)),
-    row(plots["metriclinear"]),
-    row(plots["smooth_1st_derlinear"]),
-    row(plots["smooth_2nd_derlinear"]),
-)
 log_div_text = """
 <h4>Explanation: README [6]</h4>
 """
-log_tab_layout = column(
-    row(Div(text=log_div_text, width=600)),
-    row(plots["metriclog"]),
-    row(plots["smooth_1st_derlog"]),
-    row(plots["smooth_2nd_derlog"]),
-)
-bar_tab_layout = column(
-    row(Div(text=line_div_text, width=600)),
-    row(plots["metricbar"]),
-    row(plots["smooth_1st_derbar"]),
-    row(plots["smooth_2nd_derbar"]),
-)
 forecast_text = """
 <h4>Explanation: README [7]</h4>
 """
-forecast_div = Div(text=forecast_text, width=600)
-forecast_tab_layout = column(
-    row(forecast_div),
-    row(plots["forecast_metriclinear"]),
-    row(plots["forecast_metriclog"]),
-)
-linear_tab = Panel(child=linear_tab_layout, title="Linear Scale")
-log_tab = Panel(child=log_tab_layout, title="Log Scale")
-bar_tab = Panel(child=bar_tab_layout, title="Bar Graphs")
-forecast_tab = Panel(child=forecast_tab_layout, title="Forecasts")
 accel_div_text = """
 <h4>Explanation: README [8]</h4>
 """
-accel_div = Div(text=accel_div_text, width=600)
-acceleration_tab = Panel(
-    child=column(accel_div, acceleration_table), title="Overview"
-)
+compare_div_text = """
+<h4>Explanation: README [9]</h4>
+"""
 notes_text = """
 <h4>About</h4>
 <p>
@@ -956,21 +1093,127 @@ All this site does is give access to the data produced at the sources listed in
 <strong>[7]: Forecasts</strong> Forecast numbers and plots are created using <a href="https://otexts.com/fpp2/holt.html">Holt's linear trend method with dampening</a>. This is a linear model, which means it probably significantly underestimates countries that are experiencing the acceleration phase of their epidemics. It will probably be better at forecasting countries at a more mature phase, such as Italy or Spain. Important to note is that this is just one of many methods that can forecast the data, and I have not spent a significant amount of time validating it. I may spend more time in the future investigating and adding better forecasting methods. Plots display the point forecast and 80% prediction interval (darker shading), and 95% prediction interval (lighter shading).
 </p>
 <p>
-<strong>[8]: Overview Table</strong> The "Acceleration of Last 5 Days" column is calculated by the average second derivative over the last 5 days / number of cases 5 days ago. It doesn't have much intrinsic meaning but is rather a more comparable/relative measure between countries of how fast new cases are accelerating. The table is scrollable and sortable. Highlight a row by clicking or tapping for reference when scrolling horizontally.
+<strong>[8]: Overview Table</strong> The window dropdown picks how many days (3, 5, 7 or 14) the table looks back over. The "Acceleration of Last N Days" column is calculated by the average second derivative over the last N days / number of cases N days ago. It doesn't have much intrinsic meaning but is rather a more comparable/relative measure between countries of how fast new cases are accelerating. The table is scrollable and sortable. Highlight a row by clicking or tapping for reference when scrolling horizontally.
+</p>
+<p>
+<strong>[9]: Compare</strong> Plots up to 20 countries/regions together. Type in the box to add one, click its x to remove it. The plots follow the x axis, metric, population, smoothing and date range filters above, but not the Country/Region 1 and 2 dropdowns. Hover over a line to see which country/region it is.
 </p>
 """
-notes = Div(text=notes_text, width=600)
-notes_tab = Panel(
-    child=column(notes), title="README"
-)
-tabs = Tabs(tabs=[bar_tab, linear_tab, log_tab, forecast_tab, acceleration_tab, notes_tab])
-# initialize plots with date format
-all_plots = list(plots.values())
-for p in all_plots:
-    p.xaxis.formatter = DatetimeTickFormatter(
-        days=["%d %b"], months=["%d %b"], years=["%d %b"]
+
+
+def metric_tab_layout(axis_type, div_text):
+    for metric, title in metrics.items():
+        plots[metric + axis_type] = metric_plot(metric, title, axis_type)
+    return column(
+        row(Div(text=div_text, width=600)),
+        row(plots["metric" + axis_type]),
+        row(plots["smooth_1st_der" + axis_type]),
+        row(plots["smooth_2nd_der" + axis_type]),
     )
 
+
+def forecast_tab_layout():
+    for axis_type in ["linear", "log"]:
+        plots["forecast_metric" + axis_type] = forecast_figure(
+            "metric", "Metric Title", axis_type
+        )
+    return column(
+        row(Div(text=forecast_text, width=600)),
+        row(plots["forecast_metriclinear"]),
+        row(plots["forecast_metriclog"]),
+    )
+
+
+def acceleration_tab_layout():
+    return column(
+        Div(text=accel_div_text, width=600), overview_window, acceleration_table
+    )
+
+
+def compare_tab_layout():
+    for metric, title in metrics.items():
+        plots["compare_" + metric] = compare_plot(metric, title)
+    return column(
+        Div(text=compare_div_text, width=600),
+        compare,
+        *[plots["compare_" + metric] for metric in metrics]
+    )
+
+
+def notes_tab_layout():
+    return column(Div(text=notes_text, width=600))
+
+
+# tabs start out empty, a tab's figures are built the first time it is shown
+tab_layouts = [
+    ("Bar Graphs", lambda: metric_tab_layout("bar", line_div_text)),
+    ("Linear Scale", lambda: metric_tab_layout("linear", line_div_text)),
+    ("Log Scale", lambda: metric_tab_layout("log", log_div_text)),
+    ("Forecasts", forecast_tab_layout),
+    ("Overview", acceleration_tab_layout),
+    ("Compare", compare_tab_layout),
+    ("README", notes_tab_layout),
+]
+tabs = Tabs(tabs=[Panel(child=Div(), title=title) for title, _ in tab_layouts])
+built_tabs = set()
+
+
+def attach(models):
+    """adds what models read to the schema and fills the sources that needed it"""
+    stale = set()
+    for src, columns in wire_schema(models).items():
+        if browser_dates and src in line_sources + bar_sources:
+            # read in the browser to cut the rows, which the schema can't see
+            columns = columns + ["date"]
+        known = set(schema.get(src, []))
+        if not known.issuperset(columns):
+            schema[src] = sorted(known.union(columns))
+            stale.add(src)
+    if stale & {source, bar_source}:
+        update_region(source, bar_source, select1.value, date_range.value)
+    if stale & {source2, bar_source2}:
+        update_region(source2, bar_source2, select2.value, date_range.value)
+    if fc_source in stale:
+        update_forecasts(fc_source, select1.value)
+    if fc_source2 in stale:
+        update_forecasts(fc_source2, select2.value)
+    if source_table in stale:
+        source_table.data = gen_table(select1.value, select2.value, pop_dropdown.value)
+    if source_acceleration_table in stale:
+        update_acceleration_table(pop_dropdown.value)
+    if compare_source in stale:
+        update_compare()
+
+
+def build_tab(i):
+    if i in built_tabs:
+        return
+    built_tabs.add(i)
+    before = set(plots)
+    child = tab_layouts[i][1]()
+    # in the document first, so the data the sources are filled with is counted
+    tabs.tabs[i].child = child
+    new_plots = {name: p for name, p in plots.items() if name not in before}
+    attach(list(new_plots.values()) + list(child.select({"type": DataTable})))
+    for name, p in new_plots.items():
+        if name.startswith("forecast_"):
+            p.xaxis.formatter = date_formatter
+        else:
+            set_x_formatter(p)
+    rename_plots(metric_dropdown.value, pop_dropdown.value)
+    set_bar_widths(bar_days(date_range.value))
+
+
+def tab_update(attr, old, new):
+    build_tab(new)
+
+
+tabs.on_change("active", batched(tab_update))
+
+# only the columns referenced by glyphs, hover tools and table columns are sent
+schema = wire_schema([data_table])
+build_tab(tabs.active)
+
 # final layout
 layout = column(
     row(select1, select2),
@@ -986,4 +1229,21 @@ layout = column(
     row(tabs),
 )
 curdoc().add_root(layout)
+# counts the data every source update sends, for /metrics
+curdoc().on_change(count_pushed)
 curdoc().title = "COVID-19 Status Report"
+# the sources are emptied when the session ends or sits idle
+sessions.register(
+    curdoc(),
+    [
+        source,
+        source2,
+        bar_source,
+        bar_source2,
+        fc_source,
+        fc_source2,
+        source_table,
+        source_acceleration_table,
+        compare_source,
+    ],
+)
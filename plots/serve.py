@@ -0,0 +1,90 @@
+"""bokeh serve plots, plus this worker's numbers in prometheus format at /metrics
+
+    python plots/serve.py [--port 5006] [--address ADDR] [--num-procs N]
+                          [--allow-websocket-origin HOST] [--use-xheaders]
+                          [--static-view export/] [--log-level info]
+
+The options are bokeh serve's. With --num-procs other than 1 every forked
+worker answers /metrics with its own numbers, labelled with its pid.
+
+A worker holding COVID_MAX_SESSIONS full sessions (source/sessions.py) gives
+new ones a short note instead of the report. It links to export.py's static
+page, served at /static-view/ when the --static-view directory exists.
+"""
+import argparse
+import logging
+import os
+
+from bokeh.application import Application
+from bokeh.application.handlers import DirectoryHandler
+from bokeh.command.subcommands.serve import DEFAULT_LOG_FORMAT, LOGLEVELS
+from bokeh.server.server import Server
+from bokeh.settings import settings
+from bokeh.util.logconfig import basicConfig
+from tornado.web import RequestHandler, StaticFileHandler
+
+import source.metrics as metrics
+import source.sessions as sessions
+
+
+app_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+class MetricsHandler(RequestHandler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(metrics.render())
+
+
+class CappedApplication(Application):
+    """the app, or a note for sessions past what the worker is set to hold"""
+
+    static_url = None
+
+    def initialize_document(self, doc):
+        if sessions.full():
+            sessions.turn_away(doc, self.static_url)
+        else:
+            super().initialize_document(doc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--port", type=int, default=5006)
+    parser.add_argument("--address", default=None)
+    parser.add_argument("--num-procs", type=int, default=1)
+    parser.add_argument("--allow-websocket-origin", action="append", default=[])
+    parser.add_argument("--use-xheaders", action="store_true")
+    parser.add_argument("--static-view", default="export/")
+    parser.add_argument("--log-level", default="info", choices=LOGLEVELS)
+    args = parser.parse_args()
+    # as bokeh serve does, before the app's modules log while it loads
+    log_level = settings.py_log_level(args.log_level)
+    basicConfig(level=log_level, format=DEFAULT_LOG_FORMAT)
+    logging.getLogger("bokeh").setLevel(log_level)
+    application = CappedApplication(DirectoryHandler(filename=app_dir))
+    extra_patterns = [("/metrics", MetricsHandler)]
+    if os.path.isdir(args.static_view):
+        application.static_url = "/static-view/"
+        extra_patterns.append(
+            (
+                r"/static-view/(.*)",
+                StaticFileHandler,
+                {"path": args.static_view, "default_filename": "index.html"},
+            )
+        )
+    server = Server(
+        {"/" + os.path.basename(app_dir): application},
+        port=args.port,
+        address=args.address,
+        num_procs=args.num_procs,
+        allow_websocket_origin=args.allow_websocket_origin or None,
+        use_xheaders=args.use_xheaders,
+        extra_patterns=extra_patterns,
+    )
+    server.start()
+    server.io_loop.start()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import gc
+import logging
+
+from tornado.ioloop import PeriodicCallback
+
+import source.datastore as datastore
+import source.metrics as metrics
+import source.sessions as sessions
+
+
+# bokeh runs this module before it forks the --num-procs workers, so the data
+# is loaded once here and every worker starts out sharing it. The columns sit
+# on read-only mappings of the cache's .npy files, which no worker can copy
+# by writing to them.
+# bokeh serve sets only its own logger to --log-level, the app's modules follow
+# it so the store's memory report is printed
+logging.getLogger("source").setLevel(logging.getLogger("bokeh").getEffectiveLevel())
+datastore.get()
+# keep the collector from touching, and so copying, every object loaded above
+gc.freeze()
+
+
+def on_server_loaded(server_context):
+    if sessions.idle_seconds > 0:
+        # bokeh 2's server context has no callbacks of its own, this runs on
+        # the loop of the worker being started
+        PeriodicCallback(sessions.reap_idle, 60 * 1000).start()
+
+
+def on_session_created(session_context):
+    metrics.sessions_created.inc()
+    metrics.sessions_active.inc()
+
+
+def on_session_destroyed(session_context):
+    metrics.sessions_destroyed.inc()
+    metrics.sessions_active.inc(amount=-1)
@@ -1,3 +1,5 @@
+from bokeh.palettes import Category20
+
 # plot color
 country_1_color = "#21618C"
 country_1_fc_color = "#2773a5"
@@ -6,4 +8,6 @@ country_1_95_color = "#acd2ec"
 country_2_color = "#ff4d4d"
 country_2_fc_color = "#ff6666"
 country_2_80_color = "#ff9999"
-country_2_95_color = "#ffcccc"
\ No newline at end of file
+country_2_95_color = "#ffcccc"
+# a color for each region of the comparison tab
+compare_colors = list(Category20[20])
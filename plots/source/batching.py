@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+from functools import wraps
+
+from bokeh.io import curdoc
+
+import source.sessions as sessions
+from source.metrics import measure
+
+
+def batched(callback):
+    """runs an on_change callback under a document hold
+
+    Repeated changes to the same property are combined, and everything the
+    callback changed is sent to the browser together once it returns. Its
+    time and the data it sent are recorded in source.metrics.
+    """
+
+    @wraps(callback)
+    def wrapper(attr, old, new):
+        doc = curdoc()
+        sessions.touch(doc)
+        with measure(callback.__name__):
+            doc.hold("combine")
+            try:
+                callback(attr, old, new)
+            finally:
+                doc.unhold()
+
+    return wrapper
+
+
+@contextmanager
+def frozen_models(doc):
+    """recomputes the document's models once when the block ends
+
+    Every assignment of a model-valued property otherwise walks the whole
+    document again.
+    """
+    if hasattr(doc, "models"):
+        # bokeh >= 2.4
+        with doc.models.freeze():
+            yield
+        return
+    doc._push_all_models_freeze()
+    try:
+        yield
+    finally:
+        doc._pop_all_models_freeze()
@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+
+# bump whenever a prepare function changes what it produces
+CACHE_VERSION = 3
+
+
+def cached_frame(csv_path, prepare, cache_dir="plots/data/cache/"):
+    """prepare(csv_path), cached as memory-mapped .npy blocks until the csv changes
+
+    Columns of one dtype are stored as a single 2d array, the way pandas holds
+    them, so the frame sits on the read-only mapping without being copied.
+    """
+    stat = os.stat(csv_path)
+    name = "{}-{}".format(
+        os.path.splitext(os.path.basename(csv_path))[0], prepare.__name__
+    )
+    key = "{}-{}-{}-v{}".format(name, stat.st_size, stat.st_mtime_ns, CACHE_VERSION)
+    path = os.path.join(cache_dir, key)
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        write_cache(prepare(csv_path), path)
+        remove_stale(cache_dir, name, key)
+    return read_cache(path)
+
+
+def write_cache(df, path):
+    os.makedirs(path, exist_ok=True)
+    meta = {"n_rows": len(df), "blocks": [], "objects": []}
+    groups = {}
+    for col in df.columns:
+        categorical = pd.api.types.is_categorical_dtype(df[col])
+        if categorical or df[col].dtype == object:
+            # strings are stored as integer codes into a list of unique values
+            if categorical:
+                codes, uniques = df[col].cat.codes.values, df[col].cat.categories
+            else:
+                codes, uniques = pd.factorize(df[col])
+            file_name = "object_{}".format(len(meta["objects"]))
+            save_array(path, file_name, codes.astype(np.int32))
+            meta["objects"].append(
+                {
+                    "file": file_name,
+                    "column": col,
+                    "categories": list(uniques),
+                    "categorical": categorical,
+                }
+            )
+        else:
+            groups.setdefault(df[col].dtype.str, []).append(col)
+    for i, (dtype, cols) in enumerate(groups.items()):
+        file_name = "block_{}".format(i)
+        save_array(path, file_name, np.ascontiguousarray(df[cols].values))
+        meta["blocks"].append({"file": file_name, "dtype": dtype, "columns": cols})
+    # meta.json is written last, its existence marks the cache as complete
+    tmp = os.path.join(path, "meta.json.{}".format(os.getpid()))
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, "meta.json"))
+
+
+def save_array(path, name, values):
+    # several workers may build the same cache at once, so write then rename
+    tmp = os.path.join(path, "{}.{}.npy".format(name, os.getpid()))
+    np.save(tmp, values)
+    os.replace(tmp, os.path.join(path, name + ".npy"))
+
+
+def read_cache(path):
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    frames = []
+    for block in meta["blocks"]:
+        values = np.load(os.path.join(path, block["file"] + ".npy"), mmap_mode="r")
+        frames.append(pd.DataFrame(values, columns=block["columns"], copy=False))
+    if frames:
+        df = pd.concat(frames, axis=1, copy=False)
+    else:
+        df = pd.DataFrame(index=pd.RangeIndex(meta["n_rows"]))
+    for obj in meta["objects"]:
+        codes = np.load(os.path.join(path, obj["file"] + ".npy"))
+        if obj["categorical"]:
+            df[obj["column"]] = pd.Categorical.from_codes(codes, obj["categories"])
+            continue
+        # code -1 (a missing value) picks the trailing nan
+        categories = np.array(obj["categories"] + [np.nan], dtype=object)
+        df[obj["column"]] = categories[codes]
+    return df
+
+
+def remove_stale(cache_dir, name, key):
+    # caches of older versions of the same csv, mapped files stay valid for
+    # processes still holding them open
+    for entry in os.listdir(cache_dir):
+        if entry.startswith(name + "-") and entry != key:
+            shutil.rmtree(os.path.join(cache_dir, entry), ignore_errors=True)
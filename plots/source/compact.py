@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+
+int32_max = np.iinfo(np.int32).max
+
+
+def compact_frame(df, category_columns=("country",), date_column="date"):
+    """df with narrower dtypes, for holding in every worker
+
+    Label columns become categoricals and dates int32 days since the epoch, in
+    a "day" column. Float columns of whole numbers without gaps that fit
+    become int32, every other float column float32.
+    """
+    out = pd.DataFrame(index=df.index)
+    for col in df.columns:
+        values = df[col]
+        if col in category_columns:
+            out[col] = values.astype("category")
+        elif col == date_column:
+            out["day"] = values.values.astype("datetime64[D]").astype(np.int32)
+        elif values.dtype.kind == "f":
+            finite = values.notna().all() and np.isfinite(values.values).all()
+            whole = finite and (values.values == np.round(values.values)).all()
+            if whole and np.abs(values.values).max(initial=0) <= int32_max:
+                out[col] = values.values.astype(np.int32)
+            else:
+                out[col] = values.values.astype(np.float32)
+        else:
+            out[col] = values
+    return out
+
+
+def days_to_dates(days):
+    return np.asarray(days).astype("datetime64[D]").astype("datetime64[ns]")
+
+
+def memory_report(df):
+    """one line of the bytes held per column, largest first"""
+    usage = df.memory_usage(index=False, deep=True).sort_values(ascending=False)
+    columns = ", ".join(
+        "{} {:,}".format(col, int(n_bytes)) for col, n_bytes in usage.items()
+    )
+    return "{:,} rows, {:,} bytes: {}".format(len(df), int(usage.sum()), columns)
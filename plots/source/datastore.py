@@ -0,0 +1,110 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from source.cache import cached_frame
+from source.compact import compact_frame, days_to_dates, memory_report
+from source.doubling import DoublingLines
+from source.forecasts import ForecastStore
+from source.index import SliceIndex
+from source.overview import Overview
+from source.series import SeriesStore
+from source.smoothing import Smoother
+from source.snapshot import latest_snapshots
+
+
+log = logging.getLogger(__name__)
+
+# loaded once per server process and shared read-only by every session
+_store = None
+
+
+class DataStore:
+    def __init__(self, data_path="plots/data/", compact=True):
+        cache_dir = data_path + "cache/"
+        self.compact = compact
+        self.data = cached_frame(
+            data_path + "transformed_data.csv",
+            read_compact_data if compact else read_data,
+            cache_dir,
+        )
+        log.info("transformed_data in memory: %s", memory_report(self.data))
+        self.forecasts = cached_frame(data_path + "forecasts.csv", read_forecasts, cache_dir)
+        self.groups = pd.read_csv(data_path + "country_groups.csv")
+
+        # row ranges of each country/forecast series, for slicing without full-table masks
+        self.data_index = SliceIndex(
+            self.data, "country", date_col="day" if compact else "date"
+        )
+        self.forecasts_index = SliceIndex(self.forecasts, ["country", "metric"])
+        self.smoother = Smoother(self.data, self.data_index)
+        self.doubling = DoublingLines(self.data, self.data_index)
+        # the overview table's columns, formatted once per load
+        self.snapshot = latest_snapshots(self.data, self.data_index)
+        self.snapshot_per_100k = latest_snapshots(
+            self.data, self.data_index, per_capita=True
+        )
+        self.forecast_store = ForecastStore(self.forecasts, self.forecasts_index)
+        # the overview tab's table for any window, in place of acceleration_data.csv
+        self.overview = Overview(self.data, self.data_index, self.smoother)
+        # the plots' columns for any region and dropdown values
+        self.series = SeriesStore(self)
+
+        self.countries = sorted(self.data_index.blocks)
+        self.dates = np.unique(self.data_index.dates)
+        if compact:
+            self.dates = days_to_dates(self.dates)
+
+    def columns(self, first, last):
+        """rows [first, last) of data as a dict of arrays, compact columns expanded
+
+        Columns that need no expanding are read-only views of the store.
+        """
+        columns = {col: self.data[col].values[first:last] for col in self.data.columns}
+        if self.compact:
+            columns["date"] = days_to_dates(columns.pop("day"))
+            columns["country"] = np.asarray(columns["country"], dtype=object)
+        columns["date_string"] = np.datetime_as_string(columns["date"], unit="D")
+        return columns
+
+def read_data(path):
+    data = pd.read_csv(path, parse_dates=["date"])
+    # doubling lines are generated on demand, older files still carry them
+    data = data.drop(columns=[col for col in data.columns if col.startswith("double_")])
+    data["new_active_cases"] = data.new_cases - data.new_deaths - data.new_recoveries
+    data["acceleration_active_cases"] = data.new_active_cases.diff(1)
+    data["acceleration_recoveries"] = data.new_recoveries.diff(1)
+    data = data.sort_values(["country", "date"]).reset_index(drop=True)
+    data.days_since_100 = data.days_since_100.replace(0, np.nan)
+    data.days_since_10 = data.days_since_10.replace(0, np.nan)
+    return data
+
+
+def read_compact_data(path):
+    return compact_frame(read_data(path))
+
+
+def read_forecasts(path):
+    forecasts = pd.read_csv(path, parse_dates=["date"])
+    forecasts["date_string"] = forecasts.date.dt.strftime("%Y-%0m-%0d")
+    forecasts["x_col"] = forecasts.date
+    forecasts = forecasts.sort_values(
+        ["country", "metric", "date"], kind="mergesort"
+    ).reset_index(drop=True)
+    return forecasts
+
+
+def load(data_path="plots/data/", compact=True):
+    """(re)read the csvs into the process-wide store"""
+    global _store
+    _store = DataStore(data_path, compact)
+    return _store
+
+
+def get():
+    if _store is None:
+        # COVID_DATA_PATH serves another directory of csvs, like synthetic.py's
+        load(os.path.join(os.environ.get("COVID_DATA_PATH", "plots/data/"), ""))
+    return _store
@@ -0,0 +1,56 @@
+from functools import lru_cache
+
+import numpy as np
+
+
+class DoublingLines:
+    """reference lines of a metric doubling every few days, made on demand
+
+    A line starts at the metric's value on its anchor row and grows as
+    start * 2 ** (t / days), capped at 1e9 to keep the y axis readable. Rows
+    before the anchor are 0. The anchor is the first row where an anchor
+    column (days_since_100, days_since_10) is positive, or any given row.
+    """
+
+    def __init__(self, data, index, days=(3, 5, 10), cap=1e9, maxsize=64):
+        self.data = data
+        self.index = index
+        self.days = np.array(days, dtype=np.float64)
+        self.names = ["double_{}".format(d) for d in days]
+        self.cap = cap
+        self.first_positive = lru_cache(maxsize=maxsize)(self._first_positive)
+        self.block = lru_cache(maxsize=maxsize)(self._block)
+
+    def _first_positive(self, country, column):
+        start, stop = self.index.rows(country)
+        positive = np.flatnonzero(self.data[column].values[start:stop] > 0)
+        return start + int(positive[0]) if len(positive) else None
+
+    def _block(self, country, column, anchor_row):
+        """read-only lines over country's whole block"""
+        start, stop = self.index.rows(country)
+        lines = np.zeros((stop - start, len(self.days)))
+        if anchor_row is not None:
+            first = self.data[column].values[anchor_row]
+            t = np.arange(stop - anchor_row, dtype=np.float64)[:, None]
+            lines[anchor_row - start :] = np.minimum(
+                first * np.exp2(t / self.days), self.cap
+            )
+            lines[anchor_row - start] = first
+        lines.flags.writeable = False
+        return dict(zip(self.names, lines.T))
+
+    def get(self, country, column, anchor, first, last):
+        """the lines over rows [first, last) of country's block
+
+        anchor is the name of a days-since column, or a row number.
+        """
+        if last <= first:
+            return {name: np.zeros(0) for name in self.names}
+        if isinstance(anchor, str):
+            anchor = self.first_positive(country, anchor)
+        start, _ = self.index.rows(country)
+        lines = self.block(country, column, anchor)
+        return {
+            name: values[first - start : last - start] for name, values in lines.items()
+        }
@@ -0,0 +1,100 @@
+import numpy as np
+
+
+def lttb(y, threshold):
+    """indices of the points Largest-Triangle-Three-Buckets keeps out of y
+
+    Points are taken to be evenly spaced, which daily rows are.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    x = np.arange(n, dtype=np.float64)
+    every = (n - 2) / (threshold - 2)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        # the triangle's third corner is the average of the next bucket
+        next_start = int((i + 1) * every) + 1
+        next_stop = min(int((i + 2) * every) + 1, n)
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = y[next_start:next_stop].mean()
+        start = int(i * every) + 1
+        stop = int((i + 1) * every) + 1
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:stop] - y[a])
+            - (x[a] - x[start:stop]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        kept[i + 1] = a
+    return kept
+
+
+def n_rows(columns):
+    return len(next(iter(columns.values()), ()))
+
+
+def take(columns, rows):
+    return {col: values[rows] for col, values in columns.items()}
+
+
+def thin_lines(columns, y_columns, threshold):
+    """rows of a column dict keeping the shape of every y column, at most threshold points
+
+    Each y column gets an equal share of threshold, so their union stays
+    within it.
+    """
+    if n_rows(columns) <= threshold:
+        return columns
+    share = max(3, threshold // max(1, len(y_columns)))
+    kept = np.unique(
+        np.concatenate([lttb(columns[col], share) for col in y_columns])
+    )
+    return take(columns, kept)
+
+
+def bucket_days(n_days, n_buckets):
+    return max(1, int(np.ceil(n_days / n_buckets)))
+
+
+def bucket_bars(columns, days, mean_columns, last_columns, date_axis=True):
+    """one row of a column dict per days-long bucket of the x axis
+
+    mean_columns are averaged over the bucket and last_columns take the
+    bucket's last value, date and date_string are the day the bucket starts
+    on. Buckets are aligned to multiples of days, so bars of different regions
+    line up.
+    """
+    if days <= 1 or n_rows(columns) == 0:
+        return columns
+    if date_axis:
+        key = columns["x_col"].astype("datetime64[D]").astype(np.int64)
+    else:
+        columns = take(columns, ~np.isnan(columns["x_col"]))
+        key = columns["x_col"].astype(np.int64)
+    if len(key) == 0:
+        return columns
+    group = key // days
+    starts = np.flatnonzero(np.concatenate([[True], group[1:] != group[:-1]]))
+    stops = np.concatenate([starts[1:], [len(key)]])
+    out = take(columns, starts)
+    bucket_start = group[starts] * days
+    if date_axis:
+        out["x_col"] = bucket_start.astype("datetime64[D]").astype("datetime64[ns]")
+        bucket_date = out["x_col"]
+    else:
+        out["x_col"] = bucket_start.astype(np.float64)
+        # the day the bucket starts on, key - bucket_start days before its first row
+        shift = (key[starts] - bucket_start).astype("timedelta64[D]")
+        bucket_date = columns["date"][starts] - shift
+    # the hover shows the day the bar is drawn at
+    out["date"] = bucket_date
+    out["date_string"] = np.datetime_as_string(bucket_date, unit="D")
+    for col in mean_columns:
+        values = columns[col].astype(np.float64)
+        out[col] = np.add.reduceat(values, starts) / (stops - starts)
+    for col in last_columns:
+        out[col] = columns[col][stops - 1]
+    return out
@@ -0,0 +1,44 @@
+from functools import lru_cache
+
+import numpy as np
+
+from source.per_capita import forecast_columns
+
+
+class ForecastStore:
+    """forecasts split once into a block of numpy arrays per (country, metric)
+
+    get() bounds a block by binary search on its dates and returns views, so
+    its cost does not depend on how many series are forecast. Per-100k
+    variants of a block are scaled once and kept.
+    """
+
+    def __init__(self, forecasts, index, maxsize=64):
+        columns = {col: forecasts[col].values for col in forecasts.columns}
+        self.blocks = {
+            key: {col: values[start:stop] for col, values in columns.items()}
+            for key, (start, stop) in index.blocks.items()
+        }
+        self.empty = {col: values[:0] for col, values in columns.items()}
+        self.scaled = lru_cache(maxsize=maxsize)(self._scaled)
+
+    def _scaled(self, key):
+        block = dict(self.blocks[key])
+        for col in forecast_columns:
+            values = (block[col] / block["population"]) * 100000
+            values.flags.writeable = False
+            block[col] = values
+        return block
+
+    def get(self, country, metric, start_date=None, per_capita=False):
+        """column arrays of the series from start_date on, read-only"""
+        key = (country, metric)
+        if key not in self.blocks:
+            return self.empty
+        block = self.scaled(key) if per_capita else self.blocks[key]
+        start = 0
+        if start_date is not None:
+            start = int(
+                np.searchsorted(block["date"], np.datetime64(start_date), side="left")
+            )
+        return {col: values[start:] for col, values in block.items()}
@@ -0,0 +1,65 @@
+import numpy as np
+
+
+class SliceIndex:
+    """maps each key of a frame sorted by keys + date to its [start, stop) row range
+
+    The date column holds datetime64 values or integer days since the epoch.
+    """
+
+    def __init__(self, df, keys, date_col="date"):
+        if isinstance(keys, str):
+            keys = [keys]
+        self.keys = keys
+        self.dates = df[date_col].values
+        self.blocks = {}
+        n = len(df)
+        if n == 0:
+            return
+        # a new block starts wherever any of the key columns changes value
+        changes = np.zeros(n - 1, dtype=bool)
+        for key in keys:
+            values = df[key].values
+            changes |= values[1:] != values[:-1]
+        starts = np.concatenate([[0], np.flatnonzero(changes) + 1])
+        stops = np.concatenate([starts[1:], [n]])
+        key_values = [df[key].values[starts] for key in keys]
+        for i, (start, stop) in enumerate(zip(starts, stops)):
+            if len(keys) == 1:
+                block_key = key_values[0][i]
+            else:
+                block_key = tuple(values[i] for values in key_values)
+            self.blocks[block_key] = (int(start), int(stop))
+
+    def __contains__(self, key):
+        return key in self.blocks
+
+    def rows(self, key, start_date=None, end_date=None):
+        """[start, stop) rows of key, optionally bounded to start_date <= date <= end_date"""
+        if key not in self.blocks:
+            return 0, 0
+        block_start, block_stop = self.blocks[key]
+        block_dates = self.dates[block_start:block_stop]
+        start, stop = block_start, block_stop
+        if start_date is not None:
+            start = block_start + int(
+                np.searchsorted(block_dates, self.bound(start_date, "left"), side="left")
+            )
+        if end_date is not None:
+            stop = block_start + int(
+                np.searchsorted(block_dates, self.bound(end_date, "right"), side="right")
+            )
+        return start, max(start, stop)
+
+    def bound(self, date, side):
+        """date as a key to search the date column with"""
+        date = np.datetime64(date, "ns")
+        if self.dates.dtype.kind == "M":
+            return date
+        # integer dates count days since the epoch, only whole days can match
+        days = (date - np.datetime64(0, "ns")) / np.timedelta64(1, "D")
+        return np.ceil(days) if side == "left" else np.floor(days)
+
+    def slice(self, df, key, start_date=None, end_date=None):
+        start, stop = self.rows(key, start_date, end_date)
+        return df.iloc[start:stop].reset_index(drop=True)
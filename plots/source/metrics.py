@@ -0,0 +1,173 @@
+"""this process's callback latency, data sent and session counts
+
+Kept in plain dicts, cheap enough to record on every callback, and rendered
+in the prometheus text format by serve.py's /metrics. Every sample carries
+the worker's pid, each forked worker keeps and serves its own numbers.
+"""
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from bokeh.document.events import ColumnsStreamedEvent, ModelChangedEvent
+
+
+seconds_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+bytes_buckets = tuple(4 ** i * 1024 for i in range(9))
+
+
+def labels(**values):
+    values["pid"] = os.getpid()
+    return "{" + ",".join('{}="{}"'.format(k, v) for k, v in values.items()) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, label=None, kind="counter"):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.kind = kind
+        self.values = {}
+
+    def inc(self, label_value=None, amount=1):
+        self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def lines(self):
+        yield "# HELP {} {}".format(self.name, self.help_text)
+        yield "# TYPE {} {}".format(self.name, self.kind)
+        for label_value in sorted(self.values, key=str):
+            value = self.values[label_value]
+            label_values = {self.label: label_value} if self.label else {}
+            yield "{}{} {}".format(self.name, labels(**label_values), value)
+
+
+class Gauge(Counter):
+    def __init__(self, name, help_text, label=None):
+        super().__init__(name, help_text, label, kind="gauge")
+
+
+class Computed:
+    """a gauge whose value is computed when it is rendered"""
+
+    def __init__(self, name, help_text, compute):
+        self.name = name
+        self.help_text = help_text
+        self.compute = compute
+
+    def lines(self):
+        yield "# HELP {} {}".format(self.name, self.help_text)
+        yield "# TYPE {} gauge".format(self.name)
+        yield "{}{} {}".format(self.name, labels(), self.compute())
+
+
+class Histogram:
+    def __init__(self, name, help_text, label, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        # label value -> count per bucket, the last for values past every bucket
+        self.counts = {}
+        self.sums = {}
+
+    def observe(self, label_value, value):
+        counts = self.counts.get(label_value)
+        if counts is None:
+            counts = self.counts[label_value] = [0] * (len(self.buckets) + 1)
+            self.sums[label_value] = 0
+        counts[bisect_left(self.buckets, value)] += 1
+        self.sums[label_value] += value
+
+    def lines(self):
+        yield "# HELP {} {}".format(self.name, self.help_text)
+        yield "# TYPE {} histogram".format(self.name)
+        for label_value, counts in sorted(self.counts.items()):
+            total = 0
+            for le, count in zip(self.buckets + ("+Inf",), counts):
+                total += count
+                yield "{}_bucket{} {}".format(
+                    self.name, labels(**{self.label: label_value, "le": le}), total
+                )
+            label_values = labels(**{self.label: label_value})
+            yield "{}_sum{} {}".format(self.name, label_values, self.sums[label_value])
+            yield "{}_count{} {}".format(self.name, label_values, total)
+
+
+callback_seconds = Histogram(
+    "covid_callback_seconds",
+    "Wall time of on_change callbacks.",
+    "callback",
+    seconds_buckets,
+)
+callback_bytes = Histogram(
+    "covid_callback_bytes",
+    "Bytes of column data a callback sent to the browser.",
+    "callback",
+    bytes_buckets,
+)
+source_bytes = Counter(
+    "covid_source_bytes_total",
+    "Bytes of column data sent to browsers, by replaced or streamed data.",
+    "update",
+)
+source_updates = Counter(
+    "covid_source_updates_total",
+    "ColumnDataSource updates sent to browsers, by replaced or streamed data.",
+    "update",
+)
+sessions_active = Gauge("covid_sessions_active", "Sessions open in this worker.")
+sessions_created = Counter("covid_sessions_created_total", "Sessions created.")
+sessions_destroyed = Counter("covid_sessions_destroyed_total", "Sessions destroyed.")
+registry = [
+    callback_seconds,
+    callback_bytes,
+    source_bytes,
+    source_updates,
+    sessions_active,
+    sessions_created,
+    sessions_destroyed,
+]
+
+# bytes sent so far by each callback being measured, innermost last
+_pushed = []
+
+
+def values_bytes(values):
+    if hasattr(values, "nbytes"):
+        return values.nbytes
+    # multi_line columns hold an array per row
+    return sum(getattr(v, "nbytes", 8) for v in values)
+
+
+def column_bytes(data):
+    return sum(values_bytes(values) for values in data.values())
+
+
+def count_pushed(event):
+    """Document.on_change listener, counts the column data of source updates"""
+    if not isinstance(event, ModelChangedEvent) or event.attr != "data":
+        return
+    if isinstance(event.hint, ColumnsStreamedEvent):
+        update, n_bytes = "stream", column_bytes(event.hint.data)
+    else:
+        update, n_bytes = "data", column_bytes(event.model.data)
+    source_bytes.inc(update, n_bytes)
+    source_updates.inc(update)
+    for i in range(len(_pushed)):
+        _pushed[i] += n_bytes
+
+
+@contextmanager
+def measure(callback):
+    """records the time taken and bytes sent under callback's name"""
+    _pushed.append(0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        callback_seconds.observe(callback, time.perf_counter() - start)
+        callback_bytes.observe(callback, _pushed.pop())
+
+
+def render():
+    return "\n".join(line for metric in registry for line in metric.lines()) + "\n"
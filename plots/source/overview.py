@@ -0,0 +1,76 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from source.per_capita import per_100k
+
+
+def window_names(days):
+    """names of the overview columns that depend on the window"""
+    return [
+        "Cases {} Days Ago".format(days),
+        "% Increase in {} Days".format(days),
+        "Acceleration of Last {} Days".format(days),
+    ]
+
+
+class Overview:
+    """the overview table for any window, computed from the loaded data
+
+    Matches what Acceleration.jl wrote for its 5 day window: every country's
+    latest figures, its cases days rows back, the increase since then and
+    the mean acceleration over the window relative to those cases, sorted
+    by confirmed cases. Each window and scaling is computed once.
+    """
+
+    def __init__(self, data, index, smoother, maxsize=16):
+        self.data = data
+        self.smoother = smoother
+        self.keys = sorted(index.blocks, key=lambda key: index.blocks[key][0])
+        self.starts = np.array([index.blocks[key][0] for key in self.keys], dtype=int)
+        self.stops = np.array([index.blocks[key][1] for key in self.keys], dtype=int)
+        self.table = lru_cache(maxsize=maxsize)(self._table)
+
+    def _table(self, days, per_capita=False):
+        """read-only frame of the overview for a window of days"""
+        last = self.stops - 1
+        # countries with fewer rows than the window go back to their first
+        ago = np.maximum(self.stops - days, self.starts)
+
+        def latest(column, rows=last):
+            return self.data[column].values.astype(np.float64)[rows]
+
+        cases_now = latest("confirmed")
+        cases_ago = latest("confirmed", ago)
+        deaths = latest("deaths")
+        # nan when the window has a gap or reaches past the country's first row
+        mean_acceleration = self.smoother.get("acceleration_cases", days)[last]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            acceleration = mean_acceleration / cases_ago
+            increase = cases_now / cases_ago - 1
+            death_rate = deaths / cases_now
+        acceleration[np.isnan(acceleration)] = 0
+        cases_ago_name, increase_name, acceleration_name = window_names(days)
+        table = pd.DataFrame(
+            {
+                "Country/Region": self.keys,
+                "Confirmed Cases": cases_now,
+                cases_ago_name: cases_ago,
+                increase_name: np.round(increase * 100, 2),
+                acceleration_name: np.round(acceleration * 100, 2),
+                "Recovered Cases": latest("recovered"),
+                "Active Cases": latest("active_cases"),
+                "Deaths": deaths,
+                "Death Rate": np.round(death_rate * 100, 2),
+                "population": latest("population"),
+            }
+        )
+        table = table.sort_values(
+            "Confirmed Cases", ascending=False, kind="mergesort"
+        ).reset_index(drop=True)
+        if per_capita:
+            counts = ["Confirmed Cases", cases_ago_name]
+            counts += ["Recovered Cases", "Active Cases", "Deaths"]
+            per_100k(table, counts, round=True)
+        return table
@@ -0,0 +1,26 @@
+# columns that are labels, positions or rates, which per-100k mode leaves alone
+unscaled_columns = [
+    "date",
+    "country",
+    "death_rate",
+    "days_since_100",
+    "days_since_10",
+    "population",
+    "date_string",
+    "x_col",
+]
+forecast_columns = ["point_forecast", "lo_80", "hi_80", "lo_95", "hi_95"]
+
+
+def per_100k(df, columns=None, round=False):
+    """replaces columns of a private frame or column dict with their per-100k value"""
+    if columns is None:
+        columns = [
+            col
+            for col in list(df)
+            if col not in unscaled_columns and df[col].dtype.kind in "fi"
+        ]
+    for column in columns:
+        values = (df[column] / df["population"]) * 100000
+        df[column] = values.round(2) if round else values
+    return df
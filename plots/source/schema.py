@@ -0,0 +1,65 @@
+import re
+
+import pandas as pd
+from bokeh.models import ColumnDataSource, DataTable, GlyphRenderer, HoverTool
+
+
+# "@country", "@metric{,.00}" or "@{Death Rate}" in a tooltip
+tooltip_field = re.compile(r"@\{([^}]+)\}|@(\w+)")
+
+
+def glyph_fields(glyph):
+    fields = set()
+    for name in glyph.dataspecs():
+        spec = glyph.lookup(name).serializable_value(glyph)
+        if isinstance(spec, dict) and "field" in spec:
+            fields.add(spec["field"])
+    return fields
+
+
+def tooltip_fields(tooltips):
+    if isinstance(tooltips, str):
+        tooltips = [("", tooltips)]
+    fields = set()
+    for _, text in tooltips or []:
+        for braced, plain in tooltip_field.findall(text):
+            fields.add(braced or plain)
+    return fields
+
+
+def wire_schema(models):
+    """source -> the columns its glyphs, hover tools and table columns read"""
+    schema = {}
+    for model in models:
+        if isinstance(model, DataTable):
+            schema.setdefault(model.source, set()).update(
+                column.field for column in model.columns
+            )
+            continue
+        renderers = [r for r in model.renderers if isinstance(r, GlyphRenderer)]
+        for renderer in renderers:
+            schema.setdefault(renderer.data_source, set()).update(
+                glyph_fields(renderer.glyph)
+            )
+        for tool in model.tools:
+            if not isinstance(tool, HoverTool):
+                continue
+            fields = tooltip_fields(tool.tooltips)
+            for renderer in renderers:
+                if not tool.names or renderer.name in tool.names:
+                    schema[renderer.data_source].update(fields)
+    return {
+        src: sorted(columns)
+        for src, columns in schema.items()
+        if isinstance(src, ColumnDataSource)
+    }
+
+
+def project(columns, df):
+    """the listed columns of a frame or column dict, ready for ColumnDataSource.data"""
+    data = {}
+    for col in columns:
+        if col in df:
+            values = df[col]
+            data[col] = values.values if isinstance(values, pd.Series) else values
+    return data
@@ -0,0 +1,100 @@
+from functools import lru_cache
+
+import numpy as np
+
+from source.per_capita import per_100k
+
+
+# the data columns each dropdown option reads
+count_columns = {
+    "Cases": "confirmed",
+    "Deaths": "deaths",
+    "Active Cases": "active_cases",
+    "Recovered Cases": "recovered",
+}
+new_columns = {
+    "Cases": "new_cases",
+    "Deaths": "new_deaths",
+    "Active Cases": "new_active_cases",
+    "Recovered Cases": "new_recoveries",
+}
+acceleration_columns = {
+    "Cases": "acceleration_cases",
+    "Deaths": "acceleration_deaths",
+    "Active Cases": "acceleration_active_cases",
+    "Recovered Cases": "acceleration_recoveries",
+}
+x_columns = {
+    "Date": "date",
+    "Days since 100th case": "days_since_100",
+    "Days since 10th death": "days_since_10",
+}
+
+# doubling lines follow the metric's count from its anchor day: "metric" starts
+# cases at the 100th case and deaths at the 10th death, "100th case",
+# "10th death" and "slider start" pick the same day for both
+doubling_metrics = {"Cases": ("confirmed", "days_since_100"), "Deaths": ("deaths", "days_since_10")}
+doubling_anchors = {"100th case": "days_since_100", "10th death": "days_since_10"}
+
+
+class SeriesStore:
+    """the columns the plots read for a region and the dropdowns' values
+
+    query() returns read-only arrays, views of the store wherever nothing had
+    to be computed, and keeps the last maxsize results for every session of
+    the process. Nothing shared is ever written to, so no result depends on
+    what was asked before it.
+    """
+
+    def __init__(self, store, maxsize=128):
+        self.store = store
+        self.get = lru_cache(maxsize=maxsize)(self._get)
+
+    def query(
+        self,
+        country,
+        metric,
+        start=None,
+        end=None,
+        smoothing=0,
+        per_capita=False,
+        x_axis="Date",
+        anchor="metric",
+    ):
+        """column dict of country's rows from start to end, both dates included"""
+        first, last = self.store.data_index.rows(country, start, end)
+        # slider positions within the same day share a result
+        key = (country, metric, first, last, int(smoothing), bool(per_capita))
+        return self.get(*key, x_axis, anchor)
+
+    def _get(self, country, metric, first, last, smoothing, per_capita, x_axis, anchor):
+        smoother = self.store.smoother
+        columns = self.store.columns(first, last)
+        columns["x_col"] = columns[x_columns[x_axis]]
+        columns["metric"] = columns[count_columns[metric]]
+        # moving averages come from the process-wide cache
+        columns["smooth_1st_der"] = smoother.get(new_columns[metric], smoothing)[
+            first:last
+        ]
+        columns["smooth_2nd_der"] = smoother.get(
+            acceleration_columns[metric], smoothing
+        )[first:last]
+        columns.update(self.doubling_lines(country, metric, first, last, anchor))
+        if per_capita:
+            per_100k(columns)
+        for values in columns.values():
+            values.flags.writeable = False
+        return columns
+
+    def doubling_lines(self, country, metric, first, last, anchor):
+        doubling = self.store.doubling
+        if metric not in doubling_metrics:
+            return {name: np.zeros(last - first) for name in doubling.names}
+        column, metric_anchor = doubling_metrics[metric]
+        if anchor == "slider start":
+            anchor = first
+        elif anchor == "metric":
+            anchor = metric_anchor
+        else:
+            anchor = doubling_anchors[anchor]
+        return doubling.get(country, column, anchor, first, last)
@@ -0,0 +1,133 @@
+import os
+import time
+from functools import partial
+
+from bokeh.models import Div
+
+import source.metrics as metrics
+
+
+# COVID_MAX_SESSIONS full sessions per process, 0 for no limit, past which
+# serve.py turns new sessions away. Sessions idle for COVID_IDLE_MINUTES are
+# released, 0 keeps them for as long as the browser does.
+max_sessions = int(os.environ.get("COVID_MAX_SESSIONS", 50))
+idle_seconds = float(os.environ.get("COVID_IDLE_MINUTES", 30)) * 60
+
+idle_text = """
+<p>This page was left idle and its data was released to make room for other
+visitors. Reload the page to pick up where you left off.</p>
+"""
+busy_text = """
+<p>The report has as many visitors as it can serve right now, please reload the
+page in a few minutes.{}</p>
+"""
+static_link = """
+Meanwhile the <a href="{}">static version</a> shows the default view and lets you
+switch countries.
+"""
+
+
+class Session:
+    """the sources of a session's document, for estimating and releasing them"""
+
+    def __init__(self, doc, sources):
+        self.doc = doc
+        self.sources = sources
+        self.last_active = time.monotonic()
+
+    def data_bytes(self):
+        return sum(metrics.column_bytes(src.data) for src in self.sources)
+
+    def release(self):
+        for src in self.sources:
+            src.data = {}
+
+
+# document -> its Session, for every full session of this process
+_sessions = {}
+
+
+def register(doc, sources):
+    """tracks the session serving doc, outside a server there is none to track"""
+    if doc.session_context is None:
+        return
+    _sessions[doc] = Session(doc, sources)
+    # the module and its models live on until the session is collected
+    doc.on_session_destroyed(lambda session_context: unregister(doc))
+
+
+def unregister(doc):
+    session = _sessions.pop(doc, None)
+    if session is not None:
+        session_bytes.observe("destroyed", session.data_bytes())
+        session.release()
+
+
+def touch(doc):
+    session = _sessions.get(doc)
+    if session is not None:
+        session.last_active = time.monotonic()
+
+
+def full():
+    return 0 < max_sessions <= len(_sessions)
+
+
+def data_bytes():
+    return sum(session.data_bytes() for session in _sessions.values())
+
+
+def hibernate(session):
+    """replaces an idle session's page with a note, dropping its data"""
+    if _sessions.pop(session.doc, None) is None:
+        return
+    session_bytes.observe("idle", session.data_bytes())
+    # off the document first, so emptying the sources sends nothing
+    session.doc.clear()
+    session.doc.add_root(Div(text=idle_text, width=600))
+    session.release()
+    sessions_reaped.inc()
+
+
+def reap_idle():
+    """periodic callback releasing sessions idle for longer than idle_seconds"""
+    now = time.monotonic()
+    for session in list(_sessions.values()):
+        if now - session.last_active > idle_seconds:
+            # next tick callbacks run with the document locked
+            session.doc.add_next_tick_callback(partial(hibernate, session))
+
+
+def turn_away(doc, static_url=None):
+    """fills doc with a note instead of the report, for when the process is full"""
+    link = static_link.format(static_url) if static_url else ""
+    doc.add_root(Div(text=busy_text.format(link), width=600))
+    doc.title = "COVID-19 Status Report"
+    sessions_turned_away.inc()
+
+
+session_bytes = metrics.Histogram(
+    "covid_session_bytes",
+    "Column data a session held when released, by why it was released.",
+    "reason",
+    metrics.bytes_buckets,
+)
+sessions_reaped = metrics.Counter(
+    "covid_sessions_reaped_total", "Sessions released for being idle."
+)
+sessions_turned_away = metrics.Counter(
+    "covid_sessions_turned_away_total", "Sessions turned away at max_sessions."
+)
+metrics.registry += [
+    metrics.Computed(
+        "covid_sessions_full", "Sessions holding the full report.", _sessions.__len__
+    ),
+    metrics.Computed(
+        "covid_session_data_bytes",
+        "Column data held by every full session together.",
+        data_bytes,
+    ),
+    session_bytes,
+    sessions_reaped,
+    sessions_turned_away,
+]
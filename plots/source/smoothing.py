@@ -0,0 +1,55 @@
+from functools import lru_cache
+
+import numpy as np
+
+
+class Smoother:
+    """moving averages of whole columns, computed within each country block
+
+    Matches groupby("country").rolling(days).mean(): the first days - 1 rows of
+    every country, and any window containing a nan, are nan. Averages are
+    float32 like the compact columns. Forked workers fill these caches in
+    memory of their own, so each cache holds at most half of cache_bytes.
+    """
+
+    def __init__(self, data, index, cache_bytes=32 * 2 ** 20):
+        self.data = data
+        n = len(data)
+        # first row of the block each row belongs to
+        self.block_start = np.zeros(n, dtype=np.int64)
+        for start, stop in index.blocks.values():
+            self.block_start[start:stop] = start
+        self.rows = np.arange(n)
+        # every entry is a full column: float64 sums and int32 gap counts, or
+        # float32 averages
+        per_cache = cache_bytes // 2
+        self.cumsums = lru_cache(maxsize=max(1, per_cache // (12 * (n + 1))))(
+            self._cumsums
+        )
+        self.get = lru_cache(maxsize=max(1, per_cache // (4 * max(n, 1))))(self._get)
+
+    def _cumsums(self, column):
+        values = np.asarray(self.data[column].values, dtype=np.float64)
+        missing = np.isnan(values)
+        sums = np.concatenate([[0.0], np.cumsum(np.where(missing, 0.0, values))])
+        gaps = np.concatenate([[0], np.cumsum(missing, dtype=np.int32)])
+        return sums, gaps
+
+    def _get(self, column, days):
+        """read-only array of column averaged over the last days rows"""
+        days = int(days)
+        if days <= 1:
+            values = np.asarray(self.data[column].values, dtype=np.float32)
+        else:
+            sums, gaps = self.cumsums(column)
+            first = self.rows + 1 - days
+            window_start = np.maximum(first, 0)
+            values = ((sums[self.rows + 1] - sums[window_start]) / days).astype(
+                np.float32
+            )
+            incomplete = (first < self.block_start) | (
+                gaps[self.rows + 1] - gaps[window_start] > 0
+            )
+            values[incomplete] = np.nan
+        values.flags.writeable = False
+        return values
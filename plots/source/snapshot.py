@@ -0,0 +1,69 @@
+import numpy as np
+
+
+# rows of the overview table, a snapshot lists its values in this order
+snapshot_names = [
+    "Country/Region",
+    "Data as of",
+    "Confirmed Cases",
+    "Recovered Cases",
+    "Active Cases",
+    "Deaths",
+    "Death Rate",
+    "New Cases Yesterday",
+    "Deaths Yesterday",
+]
+
+
+def latest_snapshots(data, index, per_capita=False):
+    """country -> its column of the overview table, formatted
+
+    Totals are the largest value of each country's block and daily figures
+    its last row, as the table always showed them.
+    """
+    keys = sorted(index.blocks, key=lambda key: index.blocks[key][0])
+    if not keys:
+        return {}
+    starts = np.array([index.blocks[key][0] for key in keys])
+    lasts = np.array([index.blocks[key][1] for key in keys]) - 1
+    population = data["population"].values.astype(np.float64)
+
+    def column(name):
+        values = data[name].values.astype(np.float64)
+        if per_capita:
+            values = (values / population) * 100000
+        return values
+
+    def largest(name):
+        return np.fmax.reduceat(column(name), starts)
+
+    def latest(name):
+        return column(name)[lasts]
+
+    dates = index.dates
+    latest_dates = np.maximum.reduceat(dates.astype(np.int64), starts).astype(dates.dtype)
+    if latest_dates.dtype.kind != "M":
+        # integer dates count days since the epoch
+        latest_dates = latest_dates.astype("datetime64[D]")
+    date_strings = np.datetime_as_string(latest_dates, unit="D")
+    confirmed = largest("confirmed")
+    recovered = largest("recovered")
+    active_cases = latest("active_cases")
+    deaths = largest("deaths")
+    death_rate = data["death_rate"].values.astype(np.float64)[lasts]
+    new_cases = latest("new_cases")
+    new_deaths = latest("new_deaths")
+    snapshots = {}
+    for i, key in enumerate(keys):
+        snapshots[key] = [
+            key,
+            date_strings[i],
+            "{:,.0f}".format(confirmed[i]),
+            "{:,.0f}".format(recovered[i]),
+            "{:,.0f}".format(active_cases[i]),
+            "{:,.0f}".format(deaths[i]),
+            "{:.2f}".format(death_rate[i] * 100) + "%",
+            "{:,.0f}".format(new_cases[i]),
+            "{:,.0f}".format(new_deaths[i]),
+        ]
+    return snapshots
@@ -0,0 +1,233 @@
+"""writes a made-up dataset in the layout the ETL writes, for testing offline
+
+    python plots/synthetic.py out_dir [--regions 380] [--days 1015] [--groups 12]
+                              [--group-size 25] [--seed 0]
+
+Writes transformed_data.csv, forecasts.csv and country_groups.csv to out_dir,
+which COVID_DATA_PATH=out_dir bokeh serve plots then serves in place of
+plots/data/. Of the regions one is World and --groups are groups, the rest
+are countries, each with a few waves of cases with weekly reporting dips,
+deaths following cases and recoveries two weeks after. Groups and World are
+the sums of their members, as Groups.jl and CSSE.jl make them, and forecasts
+are damped trends with widening intervals like Forecast.jl's. The same seed
+writes the same files.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+
+first_date = "2020-01-22"
+# about as many days as the real data has
+default_days = 1015
+horizon = 20
+# lower and upper bounds of the 80% and 95% prediction intervals
+interval_z = {"80": 1.2816, "95": 1.96}
+# reports dip at weekends and catch up on monday
+weekly_reporting = np.array([1.3, 1.05, 1.0, 1.0, 0.95, 0.7, 0.6])
+
+
+def waves(random, n_countries, n_days, population):
+    """expected new cases per country and day, a sum of bell shaped waves"""
+    t = np.arange(n_days)
+    expected = np.zeros((n_countries, n_days))
+    n_waves = random.randint(1, 6, n_countries)
+    for k in range(n_waves.max()):
+        has_wave = (k < n_waves)[:, None]
+        peak = random.uniform(30, n_days, n_countries)[:, None]
+        width = random.uniform(7, 60, n_countries)[:, None]
+        # share of the population infected over the wave
+        attack = np.exp(random.uniform(np.log(1e-4), np.log(5e-2), n_countries))
+        height = (attack * population)[:, None] / (width * np.sqrt(2 * np.pi))
+        expected += has_wave * height * np.exp(-0.5 * ((t - peak) / width) ** 2)
+    # nothing is reported before a country's first case
+    first_case = random.randint(0, max(n_days // 4, 1), n_countries)[:, None]
+    expected[t < first_case] = 0
+    return expected * weekly_reporting[(t + 2) % 7]
+
+
+def lagged(values, lag):
+    """values shifted lag days later per row, 0 before"""
+    t = np.arange(values.shape[1])
+    source = t - lag[:, None]
+    out = np.take_along_axis(values, np.maximum(source, 0), axis=1)
+    out[source < 0] = 0
+    return out
+
+
+def country_curves(random, n_countries, n_days, population):
+    """cumulative confirmed, deaths and recovered per country and day"""
+    new_cases = random.poisson(waves(random, n_countries, n_days, population))
+    confirmed = np.cumsum(new_cases, axis=1)
+    fatality = random.uniform(0.005, 0.03, n_countries)[:, None]
+    new_deaths = random.binomial(
+        lagged(new_cases, random.randint(7, 21, n_countries)), fatality
+    )
+    deaths = np.minimum(np.cumsum(new_deaths, axis=1), confirmed)
+    recovered = np.maximum(lagged(confirmed, np.full(n_countries, 14)) - deaths, 0)
+    recovered = np.maximum.accumulate(recovered, axis=1)
+    # deaths can still catch up with earlier cases, active cases stay >= 0
+    recovered = np.minimum(recovered, confirmed - deaths)
+    return confirmed.astype(float), deaths.astype(float), recovered.astype(float)
+
+
+def differences(values):
+    """day on day changes, 0 on the first day like the ETL"""
+    out = np.zeros_like(values)
+    out[:, 1:] = np.diff(values, axis=1)
+    return out
+
+
+def days_since(values, threshold, inclusive=False):
+    passed = values >= threshold if inclusive else values > threshold
+    return np.cumsum(passed, axis=1)
+
+
+def region_frame(names, dates, population, confirmed, deaths, recovered, inclusive):
+    n_regions, n_days = confirmed.shape
+    new_cases = differences(confirmed)
+    new_deaths = differences(deaths)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        death_rate = deaths / confirmed
+    columns = {
+        "date": np.tile(dates, n_regions),
+        "country": np.repeat(names, n_days),
+        "confirmed": confirmed,
+        "deaths": deaths,
+        "death_rate": death_rate,
+        "recovered": recovered,
+        "active_cases": confirmed - deaths - recovered,
+        "new_cases": new_cases,
+        "new_deaths": new_deaths,
+        "new_recoveries": differences(recovered),
+        "acceleration_cases": differences(new_cases),
+        "acceleration_deaths": differences(new_deaths),
+        "days_since_100": days_since(confirmed, 100, inclusive),
+        "days_since_10": days_since(deaths, 10, inclusive),
+        "population": np.repeat(population, n_days),
+    }
+    return pd.DataFrame({k: np.ravel(v) for k, v in columns.items()})
+
+
+def forecast_frame(names, last_date, population, series):
+    """damped trend forecasts of every metric for regions past 100 cases"""
+    phi = 0.9
+    h = np.arange(1, horizon + 1)
+    damped = np.cumsum(phi ** h)
+    # like forecasts.csv, the first forecast is dated on the last observed day
+    dates = pd.date_range(last_date, periods=horizon)
+    keep = series["cases"][:, -1] >= 100
+    frames = []
+    for metric, values in series.items():
+        values = values[keep]
+        steps = np.diff(values[:, -29:], axis=1)
+        trend = steps[:, -7:].mean(axis=1)
+        spread = steps.std(axis=1)
+        point = values[:, -1:] + trend[:, None] * damped
+        columns = {
+            "date": np.tile(dates, len(values)),
+            "country": np.repeat(names[keep], horizon),
+            "metric": np.repeat(metric, len(values) * horizon),
+            "point_forecast": point,
+        }
+        for level, z in interval_z.items():
+            width = z * spread[:, None] * np.sqrt(h)
+            columns["lo_" + level] = point - width
+            columns["hi_" + level] = point + width
+        columns["population"] = np.repeat(population[keep], horizon)
+        frames.append(pd.DataFrame({k: np.ravel(v) for k, v in columns.items()}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def generate(
+    out_dir, n_regions=380, n_days=default_days, n_groups=12, group_size=25, seed=0
+):
+    """writes the three csvs to out_dir, returns the number of data rows"""
+    random = np.random.RandomState(seed)
+    n_groups = min(n_groups, max(n_regions - 2, 0))
+    n_countries = n_regions - n_groups - 1
+    dates = pd.date_range(first_date, periods=n_days).values
+    countries = np.array(["Country {:05d}".format(i + 1) for i in range(n_countries)])
+    population = np.round(
+        np.exp(random.uniform(np.log(1e4), np.log(1.4e9), n_countries))
+    )
+    confirmed, deaths, recovered = country_curves(
+        random, n_countries, n_days, population
+    )
+
+    # groups and World are sums of their members
+    group_names = np.array(["Group {:02d}".format(i + 1) for i in range(n_groups)])
+    members = np.zeros((n_groups, n_countries))
+    for i in range(n_groups):
+        size = min(group_size, n_countries)
+        members[i, random.choice(n_countries, size, replace=False)] = 1
+    groups = pd.DataFrame(
+        [
+            (group_names[i], countries[j])
+            for i in range(n_groups)
+            for j in np.flatnonzero(members[i])
+        ],
+        columns=["group", "country"],
+    )
+
+    # countries, then World, then groups, the order the ETL appends them in
+    names = np.concatenate([countries, ["World"], group_names])
+    weights = np.vstack([np.ones((1, n_countries)), members])
+    population = np.concatenate([population, weights @ population])
+    confirmed, deaths, recovered = [
+        np.vstack([values, weights @ values])
+        for values in (confirmed, deaths, recovered)
+    ]
+    frames = []
+    # Groups.jl counts days from >= 100 cases, CSSE.jl from > 100
+    for rows, inclusive in [(slice(0, n_countries), False), (slice(n_countries, None), True)]:
+        frames.append(
+            region_frame(
+                names[rows],
+                dates,
+                population[rows],
+                confirmed[rows],
+                deaths[rows],
+                recovered[rows],
+                inclusive,
+            )
+        )
+    data = pd.concat(frames, ignore_index=True)
+    # CSSE.jl counts World's days from its first row
+    world = data.country.values == "World"
+    data.loc[world, "days_since_100"] = data.loc[world, "days_since_10"] = np.arange(
+        1, n_days + 1
+    )
+    series = {
+        "cases": confirmed,
+        "deaths": deaths,
+        "recovered": recovered,
+        "active_cases": confirmed - deaths - recovered,
+    }
+    forecasts = forecast_frame(names, dates[-1], population, series)
+
+    os.makedirs(out_dir, exist_ok=True)
+    data.to_csv(os.path.join(out_dir, "transformed_data.csv"), index=False)
+    forecasts.to_csv(os.path.join(out_dir, "forecasts.csv"), index=False)
+    groups.to_csv(os.path.join(out_dir, "country_groups.csv"), index=False)
+    return len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("out_dir")
+    parser.add_argument("--regions", type=int, default=380)
+    parser.add_argument("--days", type=int, default=default_days)
+    parser.add_argument("--groups", type=int, default=12)
+    parser.add_argument("--group-size", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate(
+        args.out_dir, args.regions, args.days, args.groups, args.group_size, args.seed
+    )
+
+
+if __name__ == "__main__":
+    main()